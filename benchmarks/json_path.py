@@ -0,0 +1,47 @@
+"""
+Compares JSONPath lookups by compiled path against parsing with jsonpath-ng on
+every call, the way Get used to. Run from the repository root with:
+
+    python -m benchmarks.json_path
+"""
+
+import timeit
+
+from jsonpath_ng.ext import parse
+
+from smartspace.blocks.json_path import compile_path
+
+DOCUMENT = {
+    "user": {"name": "Ada", "roles": ["admin", "dev"], "address": {"city": "London"}},
+    "items": [{"id": i, "price": i * 1.5, "tags": ["a", "b"]} for i in range(100)],
+}
+
+PATHS = {
+    "field": "$.user",
+    "dotted": "$.user.address.city",
+    "index": "$.items[42].price",
+    "quoted": "$['user']['roles'][1]",
+    "wildcard": "$.items[*].id",
+    "filter": "$.items[?(@.price > 100)].id",
+}
+
+
+def main():
+    number = 1000
+    print(f"{'path':<10} {'parse+find':>12} {'compiled':>12} {'speedup':>8}")
+    for name, path in PATHS.items():
+        compiled = compile_path(path)
+        assert compiled(DOCUMENT) == [m.value for m in parse(path).find(DOCUMENT)]
+
+        uncached = timeit.timeit(
+            lambda: [m.value for m in parse(path).find(DOCUMENT)], number=number
+        )
+        cached = timeit.timeit(lambda: compile_path(path)(DOCUMENT), number=number)
+        print(
+            f"{name:<10} {uncached / number * 1e6:>10.1f}us {cached / number * 1e6:>10.1f}us"
+            f" {uncached / cached:>7.0f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
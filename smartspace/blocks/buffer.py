@@ -1,24 +1,75 @@
+import time
+from enum import Enum
 from typing import Annotated, Any, Generic, TypeVar
 
-from smartspace.core import Block, Output, State, step
+from smartspace.core import Block, Config, Output, State, step
 
 ValueT = TypeVar("ValueT")
 
 
+class BufferOverflow(Enum):
+    # Drop the value that has waited longest to make room
+    DROP_OLDEST = "drop_oldest"
+    # Drop the value that just arrived
+    DROP_NEWEST = "drop_newest"
+    # Keep every value and send full so upstream can pause until it is False
+    BLOCK = "block"
+
+
 class Buffer(Block, Generic[ValueT]):
+    # Values released for each next, above 1 they are sent as a list through batch
+    batch_size: Annotated[int, Config()] = 1
+    # Release everything once the oldest value has waited this long, even if next
+    # has not been called since the last release. 0 to only release on next.
+    # Checked as values arrive
+    flush_ms: Annotated[int, Config()] = 0
+    # Values the buffer holds before overflow applies, 0 for no limit
+    max_size: Annotated[int, Config()] = 0
+    overflow: Annotated[BufferOverflow, Config()] = BufferOverflow.BLOCK
+
     values: Annotated[list[ValueT], State()] = []
     ready: Annotated[bool, State()] = True
+    full: Annotated[bool, State()] = False
+    # When each value arrived, as a unix time in seconds. Wall clock time so it can
+    # be compared between runs on different workers
+    arrived_at: Annotated[list[float], State()] = []
+
     output: Output[ValueT]
+    batch: Output[list[ValueT]]
+    is_full: Output[bool]
 
     @step()
     async def value(self, value: ValueT):
-        self.values.append(value)
-        await self._inner()
+        # Never append to the class level defaults
+        if self.values is Buffer.values:
+            self.values = []
+        if self.arrived_at is Buffer.arrived_at:
+            self.arrived_at = []
+
+        if self.max_size <= 0 or len(self.values) < self.max_size:
+            self._append(value)
+        elif self.overflow == BufferOverflow.DROP_OLDEST:
+            del self.values[0]
+            del self.arrived_at[0]
+            self._append(value)
+        elif self.overflow == BufferOverflow.BLOCK:
+            self._append(value)
+
+        if self._flush_due():
+            # A flush releases every value without waiting on next, so values are
+            # never held longer than flush_ms. It leaves ready as it was
+            while self.values:
+                self._release()
+        else:
+            await self._inner()
+
+        self._update_full()
 
     @step()
     async def next(self, next: Any):
         self.ready = True
         await self._inner()
+        self._update_full()
 
     async def _inner(self):
         if not self.ready:
@@ -26,5 +77,32 @@ class Buffer(Block, Generic[ValueT]):
 
         if len(self.values):
             self.ready = False
-            v = self.values.pop(0)
-            self.output.send(v)
+            self._release()
+
+    def _append(self, value: ValueT):
+        self.values.append(value)
+        self.arrived_at.append(time.time())
+
+    def _flush_due(self) -> bool:
+        if self.flush_ms <= 0 or not self.arrived_at:
+            return False
+
+        return (time.time() - self.arrived_at[0]) * 1000 >= self.flush_ms
+
+    def _release(self):
+        size = max(self.batch_size, 1)
+        released = self.values[:size]
+        # One slice per release rather than popping each value from the front
+        del self.values[:size]
+        del self.arrived_at[:size]
+
+        if size == 1:
+            self.output.send(released[0])
+        else:
+            self.batch.send(released)
+
+    def _update_full(self):
+        full = 0 < self.max_size <= len(self.values)
+        if self.overflow == BufferOverflow.BLOCK and full != self.full:
+            self.is_full.send(full)
+        self.full = full
@@ -0,0 +1,88 @@
+from typing import Any, Iterable, Iterator, Sequence
+
+
+def is_columnar(value: Any) -> bool:
+    """
+    Checks for a columnar table, {"columns": [...], "data": {column: [values]}},
+    which stores each column name once instead of once per row.
+
+    Every listed column must have a list of values in "data", and all of those
+    lists must be the same length, so ordinary JSON that happens to use the keys
+    "columns" and "data" is not mistaken for a table.
+    """
+    if not (
+        isinstance(value, dict)
+        and value.keys() == {"columns", "data"}
+        and isinstance(value["columns"], list)
+        and isinstance(value["data"], dict)
+    ):
+        return False
+
+    columns, data = value["columns"], value["data"]
+    if not all(isinstance(column, str) for column in columns):
+        return False
+    if len(set(columns)) != len(columns) or set(columns) != data.keys():
+        return False
+    if not all(isinstance(values, list) for values in data.values()):
+        return False
+
+    return len({len(values) for values in data.values()}) <= 1
+
+
+def to_columnar(
+    columns: Sequence[str], rows: Iterable[Sequence[Any]]
+) -> dict[str, Any]:
+    """Builds a columnar table from rows of values in column order."""
+    values = list(zip(*rows))
+    if not values:
+        values = [()] * len(columns)
+
+    return {
+        "columns": list(columns),
+        "data": {column: list(v) for column, v in zip(columns, values)},
+    }
+
+
+def rows_to_columnar(rows: Iterable[dict[str, Any]]) -> dict[str, Any]:
+    """Builds a columnar table from row dicts, filling missing values with None."""
+    rows = list(rows)
+    columns: dict[str, None] = {}
+    for row in rows:
+        columns.update(dict.fromkeys(row))
+
+    return to_columnar(
+        list(columns), ([row.get(column) for column in columns] for row in rows)
+    )
+
+
+def row_count(table: dict[str, Any]) -> int:
+    columns = table["columns"]
+    return len(table["data"][columns[0]]) if columns else 0
+
+
+def get_row(table: dict[str, Any], index: int) -> dict[str, Any]:
+    data = table["data"]
+    return {column: data[column][index] for column in table["columns"]}
+
+
+def iter_rows(table: dict[str, Any]) -> Iterator[dict[str, Any]]:
+    columns = table["columns"]
+    for values in zip(*(table["data"][column] for column in columns)):
+        yield dict(zip(columns, values))
+
+
+def concat_columnar(tables: Iterable[dict[str, Any]]) -> dict[str, Any]:
+    """Appends the rows of columnar tables, filling columns a table lacks with None."""
+    tables = list(tables)
+    columns: dict[str, None] = {}
+    for table in tables:
+        columns.update(dict.fromkeys(table["columns"]))
+
+    data: dict[str, list[Any]] = {column: [] for column in columns}
+    for table in tables:
+        count = row_count(table)
+        for column in columns:
+            values = table["data"].get(column)
+            data[column].extend(values if values is not None else [None] * count)
+
+    return {"columns": list(columns), "data": data}
@@ -1,10 +1,28 @@
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import random
+import time
+import weakref
+from collections import OrderedDict, deque
+from email.utils import parsedate_to_datetime
 from enum import Enum
-from typing import Annotated, Any, Iterable
+from functools import lru_cache
+from typing import Annotated, Any, AsyncIterator, Iterable, NamedTuple
 
 import httpx
 from pydantic import BaseModel
 
-from smartspace.core import Block, Config, Metadata, metadata, step
+from smartspace.core import (
+    Block,
+    Config,
+    Metadata,
+    OutputChannel,
+    metadata,
+    step,
+)
 from smartspace.enums import BlockCategory
 
 
@@ -45,12 +63,418 @@ class HTTPError(Exception):
         super().__init__(self.message)
 
 
+class StreamFormat(str, Enum):
+    BYTES = "bytes"
+    LINES = "lines"
+    NDJSON = "ndjson"
+    SSE = "sse"
+
+
+class SSEEvent(BaseModel):
+    event: str = "message"
+    data: str
+    id: str | None = None
+    retry: int | None = None
+
+
+class HTTPBatchResult(BaseModel):
+    index: int  # Position of the request in the batch
+    response: ResponseObject | None = None
+    error: str | None = None
+    status_code: int | None = None
+
+
+class _RateLimiter:
+    """Spaces out calls to wait() so they start at most rate times per second"""
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate
+        self.next_time = 0.0
+
+    async def wait(self):
+        now = asyncio.get_running_loop().time()
+        start = max(now, self.next_time)
+        self.next_time = start + self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+
+IDEMPOTENT_METHODS = {HTTPMethod.GET, HTTPMethod.PUT, HTTPMethod.DELETE}
+RETRY_STATUS_CODES = {429, 502, 503, 504}
+
+
+class LatencyHistogram:
+    """Latencies of the most recent requests to a host"""
+
+    min_samples = 20
+
+    def __init__(self, max_samples: int = 1000):
+        self.samples: deque[float] = deque(maxlen=max_samples)
+
+    def record(self, seconds: float):
+        self.samples.append(seconds)
+
+    def percentile(self, percentile: float) -> float | None:
+        """Returns None until there are enough samples to be meaningful"""
+        if len(self.samples) < self.min_samples:
+            return None
+
+        ordered = sorted(self.samples)
+        index = min(int(len(ordered) * percentile / 100), len(ordered) - 1)
+        return ordered[index]
+
+
+# Latencies by origin, shared by every HTTPRequest
+host_latencies: dict[str, LatencyHistogram] = {}
+
+
+class HTTPClientKey(NamedTuple):
+    origin: str
+    timeout: float
+    verify_ssl: bool
+    http2: bool
+    max_connections: int
+    max_keepalive_connections: int
+    keepalive_expiry: float
+
+
+class HTTPPoolMetrics(BaseModel):
+    origin: str
+    open_connections: int
+    requests: int
+    new_connections: int
+    reuse_rate: float
+
+
+class _PooledClient:
+    def __init__(self, key: HTTPClientKey):
+        self.key = key
+        self.transport = httpx.AsyncHTTPTransport(
+            verify=key.verify_ssl,
+            http2=key.http2,
+            limits=httpx.Limits(
+                max_connections=key.max_connections,
+                max_keepalive_connections=key.max_keepalive_connections,
+                keepalive_expiry=key.keepalive_expiry,
+            ),
+        )
+        self.client = httpx.AsyncClient(timeout=key.timeout, transport=self.transport)
+        self.requests = 0
+        self.new_connections = 0
+
+    async def trace(self, event_name: str, info: dict[str, Any]):
+        if event_name == "connection.connect_tcp.complete":
+            self.new_connections += 1
+
+    def metrics(self) -> HTTPPoolMetrics:
+        # httpx does not expose its connection pool, the transport keeps it on _pool
+        pool = getattr(self.transport, "_pool", None)
+        return HTTPPoolMetrics(
+            origin=self.key.origin,
+            open_connections=len(pool.connections) if pool else 0,
+            requests=self.requests,
+            new_connections=self.new_connections,
+            reuse_rate=1 - self.new_connections / self.requests if self.requests else 0,
+        )
+
+
+class HTTPClientPool:
+    """
+    Process-wide pool of keep-alive clients, one per origin and client settings.
+    httpx clients can only be used on the event loop they were created on,
+    so each event loop has its own set of clients.
+    """
+
+    def __init__(self):
+        self._clients: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, dict[HTTPClientKey, _PooledClient]
+        ] = weakref.WeakKeyDictionary()
+
+    def get(self, key: HTTPClientKey) -> _PooledClient:
+        clients = self._clients.setdefault(asyncio.get_running_loop(), {})
+        if key not in clients:
+            clients[key] = _PooledClient(key)
+
+        return clients[key]
+
+    def metrics(self) -> list[HTTPPoolMetrics]:
+        return [
+            client.metrics()
+            for clients in self._clients.values()
+            for client in clients.values()
+        ]
+
+    async def aclose(self):
+        """Closes the clients created on the current event loop"""
+        clients = self._clients.pop(asyncio.get_running_loop(), {})
+        for client in clients.values():
+            await client.client.aclose()
+
+
+http_client_pool = HTTPClientPool()
+
+
+def get_origin(url: str) -> str:
+    parsed = httpx.URL(url)
+    origin = f"{parsed.scheme}://{parsed.host}"
+    if parsed.port:
+        origin += f":{parsed.port}"
+
+    return origin
+
+
+class HTTPClientConfig:
+    """Config of the pooled client used by the HTTP blocks"""
+
+    timeout: Annotated[int, Config()] = 30  # Timeout in seconds
+    max_connections: Annotated[int, Config()] = 100
+    max_keepalive_connections: Annotated[int, Config()] = 20
+    # Idle seconds before a pooled connection is closed
+    keepalive_expiry: Annotated[float, Config()] = 5.0
+    http2: Annotated[bool, Config()] = False  # Requires the h2 package
+    verify_ssl: Annotated[bool, Config()] = True
+
+    def _get_client(self, url: str) -> _PooledClient:
+        return http_client_pool.get(
+            HTTPClientKey(
+                origin=get_origin(url),
+                timeout=self.timeout,
+                verify_ssl=self.verify_ssl,
+                http2=self.http2,
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive_connections,
+                keepalive_expiry=self.keepalive_expiry,
+            )
+        )
+
+
+class CachedResponse:
+    def __init__(
+        self,
+        response: ResponseObject,
+        expires_at: float,
+        etag: str | None = None,
+        last_modified: str | None = None,
+    ):
+        self.response = response
+        self.expires_at = expires_at  # time.time() after which it must be revalidated
+        self.etag = etag
+        self.last_modified = last_modified
+
+    @property
+    def fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+    def to_json(self) -> str:
+        content = self.response.content
+        if isinstance(content, str):
+            content = content.encode()
+        elif not isinstance(content, bytes):
+            content = b"".join(content)
+
+        return json.dumps(
+            {
+                "status_code": self.response.status_code,
+                "headers": self.response.headers,
+                "content": base64.b64encode(content).decode(),
+                "text": self.response.text,
+                "body": self.response.body,
+                "expires_at": self.expires_at,
+                "etag": self.etag,
+                "last_modified": self.last_modified,
+            }
+        )
+
+    @classmethod
+    def from_json(cls, data: str) -> "CachedResponse":
+        values = json.loads(data)
+        return cls(
+            response=ResponseObject(
+                status_code=values["status_code"],
+                headers=values["headers"],
+                content=base64.b64decode(values["content"]),
+                text=values["text"],
+                body=values["body"],
+            ),
+            expires_at=values["expires_at"],
+            etag=values["etag"],
+            last_modified=values["last_modified"],
+        )
+
+
+class HTTPResponseCache:
+    """
+    LRU cache of responses kept in memory, with an optional directory that
+    keeps entries evicted from memory and shares them between processes.
+    The directory holds at most max_disk_entries responses, the least recently
+    used are removed first. Files are read and written in a worker thread so
+    the event loop is not blocked.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        cache_dir: str | None = None,
+        max_disk_entries: int = 1024,
+    ):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.max_disk_entries = max_disk_entries
+        self._entries: OrderedDict[str, CachedResponse] = OrderedDict()
+
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    async def get(self, key: str) -> CachedResponse | None:
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+        path = self._path(key)
+        if path:
+            entry = await asyncio.to_thread(self._read, path)
+            if entry:
+                self._remember(key, entry)
+            return entry
+
+        return None
+
+    async def set(self, key: str, entry: CachedResponse):
+        self._remember(key, entry)
+
+        path = self._path(key)
+        if path:
+            await asyncio.to_thread(self._write, path, entry.to_json())
+
+    def clear(self):
+        self._entries.clear()
+        if self.cache_dir:
+            for name in os.listdir(self.cache_dir):
+                if name.endswith(".json"):
+                    os.remove(os.path.join(self.cache_dir, name))
+
+    def _remember(self, key: str, entry: CachedResponse):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _path(self, key: str) -> str | None:
+        if not self.cache_dir:
+            return None
+
+        name = hashlib.sha256(key.encode()).hexdigest()
+        return os.path.join(self.cache_dir, f"{name}.json")
+
+    def _read(self, path: str) -> CachedResponse | None:
+        try:
+            with open(path) as f:
+                entry = CachedResponse.from_json(f.read())
+            # The modification time orders the files for eviction
+            os.utime(path)
+        except (OSError, ValueError, KeyError):
+            # Missing, or removed or replaced by another process while reading
+            return None
+
+        return entry
+
+    def _write(self, path: str, data: str):
+        # Written to a temporary file first so other processes never read a partial entry
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        with open(temporary_path, "w") as f:
+            f.write(data)
+        os.replace(temporary_path, path)
+
+        assert self.cache_dir
+        files = [
+            entry
+            for entry in os.scandir(self.cache_dir)
+            if entry.name.endswith(".json")
+        ]
+        if len(files) > self.max_disk_entries:
+            files.sort(key=lambda entry: entry.stat().st_mtime)
+            for entry in files[: len(files) - self.max_disk_entries]:
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
+
+
+@lru_cache(maxsize=None)
+def get_response_cache(
+    max_entries: int = 256,
+    cache_dir: str | None = None,
+    max_disk_entries: int = 1024,
+) -> HTTPResponseCache:
+    """Returns the process-wide cache for the given settings"""
+    return HTTPResponseCache(max_entries, cache_dir, max_disk_entries)
+
+
+def _cache_lifetime(headers: httpx.Headers, ttl: float | None) -> float | None:
+    """
+    Seconds a response stays fresh according to Cache-Control and Expires,
+    or None if it must not be stored. ttl overrides the response headers.
+    """
+    directives: dict[str, str | None] = {}
+    for directive in headers.get("cache-control", "").split(","):
+        name, _, value = directive.strip().partition("=")
+        if name:
+            directives[name.lower()] = value.strip('"') or None
+
+    if "no-store" in directives:
+        return None
+
+    if ttl is not None:
+        return ttl
+
+    if "no-cache" in directives:
+        return 0
+
+    max_age = directives.get("max-age")
+    if max_age is not None:
+        try:
+            return max(float(max_age), 0)
+        except ValueError:
+            return 0
+
+    if "expires" in headers:
+        try:
+            expires = parsedate_to_datetime(headers["expires"]).timestamp()
+        except (TypeError, ValueError):
+            return 0
+        return max(expires - time.time(), 0)
+
+    return 0
+
+
 @metadata(
     description="Performs HTTP requests such as GET, POST, PUT, DELETE, and more.",
     category=BlockCategory.FUNCTION,
 )
-class HTTPRequest(Block):
-    timeout: Annotated[int, Config()] = 30  # Timeout in seconds
+class HTTPRequest(HTTPClientConfig, Block):
+    concurrency: Annotated[int, Config()] = 10  # Batch requests in flight, at least 1
+    # Rate limit for batch requests to each host
+    requests_per_second: Annotated[float | None, Config()] = None
+    # Cache GET responses, honoring Cache-Control and Expires
+    cache: Annotated[bool, Config()] = False
+    cache_max_entries: Annotated[int, Config()] = 256
+    # Directory that stores cached responses on disk as well as in memory
+    cache_dir: Annotated[str | None, Config()] = None
+    # Responses kept in cache_dir, the least recently used are removed first
+    cache_max_disk_entries: Annotated[int, Config()] = 1024
+    # Seconds to cache responses for, ignoring the response caching headers
+    cache_ttl: Annotated[float | None, Config()] = None
+    # Retries and hedging only apply to idempotent methods (GET, PUT and DELETE)
+    max_retries: Annotated[int, Config()] = 0
+    # Base of the jittered exponential backoff between retries, in seconds
+    retry_backoff: Annotated[float, Config()] = 0.1
+    # Total seconds allowed for all attempts, None for no limit
+    latency_budget: Annotated[float | None, Config()] = None
+    # Send a duplicate request when the first is slower than hedge_percentile
+    hedge: Annotated[bool, Config()] = False
+    hedge_percentile: Annotated[float, Config()] = 95.0
+    # Seconds to wait before hedging until enough latencies are recorded for the host
+    hedge_delay: Annotated[float, Config()] = 1.0
 
     method: Annotated[HTTPMethod, Config()] = HTTPMethod.GET
     url: Annotated[str, Config()] = ""
@@ -58,6 +482,8 @@ class HTTPRequest(Block):
     query_params: Annotated[dict[str, Any] | None, Config()] = None
     body: Annotated[dict[str, Any] | None, Config()] = None
 
+    result: OutputChannel[HTTPBatchResult]
+
     @step(output_name="response")
     async def make_request(
         self,
@@ -68,58 +494,419 @@ class HTTPRequest(Block):
             ),
         ],
     ) -> ResponseObject:
+        return await self._send(request)
+
+    @step(output_name="responses")
+    async def make_requests(
+        self,
+        requests: Annotated[
+            list[RequestObject],
+            Metadata(
+                description="Requests to make concurrently. Any values not specified will use the Config values"
+            ),
+        ],
+    ) -> list[HTTPBatchResult]:
+        results: list[HTTPBatchResult] = [
+            HTTPBatchResult(index=i) for i in range(len(requests))
+        ]
+
+        # A concurrency below 1 would never let a request start
+        semaphore = asyncio.Semaphore(max(self.concurrency, 1))
+        limiters: dict[str, _RateLimiter] = {}
+
+        async def run(index: int, request: RequestObject):
+            results[index] = await self._send_batch_item(
+                index, request, semaphore, limiters
+            )
+
+        await asyncio.gather(*[run(i, r) for i, r in enumerate(requests)])
+        return results
+
+    @step()
+    async def stream_requests(
+        self,
+        requests: Annotated[
+            list[RequestObject],
+            Metadata(
+                description="Requests to make concurrently. Each result is sent with its index as soon as it completes"
+            ),
+        ],
+    ):
+        semaphore = asyncio.Semaphore(max(self.concurrency, 1))
+        limiters: dict[str, _RateLimiter] = {}
+        tasks = [
+            self._send_batch_item(i, r, semaphore, limiters)
+            for i, r in enumerate(requests)
+        ]
+        for completed in asyncio.as_completed(tasks):
+            self.result.send(await completed)
+
+        self.result.close()
+
+    async def _send_batch_item(
+        self,
+        index: int,
+        request: RequestObject,
+        semaphore: asyncio.Semaphore,
+        limiters: dict[str, _RateLimiter],
+    ) -> HTTPBatchResult:
+        async with semaphore:
+            try:
+                url = request.url or self.url
+                if self.requests_per_second and url:
+                    origin = get_origin(url)
+                    if origin not in limiters:
+                        limiters[origin] = _RateLimiter(self.requests_per_second)
+                    await limiters[origin].wait()
+
+                response = await self._send(request)
+                return HTTPBatchResult(
+                    index=index,
+                    response=response,
+                    status_code=response.status_code,
+                )
+            except HTTPError as e:
+                return HTTPBatchResult(
+                    index=index,
+                    response=e.response,
+                    error=e.message,
+                    status_code=e.status_code,
+                )
+            except Exception as e:
+                return HTTPBatchResult(index=index, error=str(e))
+
+    async def _send(self, request: RequestObject) -> ResponseObject:
         # Helper to get the effective value from request or config
         def get_effective_value(attr: str):
             return getattr(request, attr) or getattr(self, attr)
 
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            try:
-                url = get_effective_value("url")
-                if not url:
-                    raise ValueError("URL is required")
-                response = await client.request(
-                    method=get_effective_value("method"),
-                    url=url,
-                    headers=get_effective_value("headers") or {},
-                    params=get_effective_value("query_params") or {},
-                    json=get_effective_value("body")
-                    if get_effective_value("method") in ["POST", "PUT", "PATCH"]
-                    else None,
+        try:
+            url = get_effective_value("url")
+            if not url:
+                raise ValueError("URL is required")
+
+            method = get_effective_value("method")
+            headers = get_effective_value("headers") or {}
+            params = get_effective_value("query_params") or {}
+
+            cache = (
+                self._get_response_cache()
+                if self.cache and method == HTTPMethod.GET
+                else None
+            )
+            cache_key = json.dumps([url, params, headers], sort_keys=True, default=str)
+            cached = await cache.get(cache_key) if cache else None
+
+            if cached:
+                if cached.fresh:
+                    # Return a copy so callers cannot change the cached response
+                    return cached.response.model_copy(deep=True)
+
+                headers = dict(headers)
+                if cached.etag:
+                    headers["If-None-Match"] = cached.etag
+                if cached.last_modified:
+                    headers["If-Modified-Since"] = cached.last_modified
+
+            response = await self._fetch(
+                method=method,
+                url=url,
+                headers=headers,
+                params=params,
+                json=get_effective_value("body")
+                if method in ["POST", "PUT", "PATCH"]
+                else None,
+            )
+
+            if cache and cached and response.status_code == 304:
+                lifetime = _cache_lifetime(response.headers, self.cache_ttl)
+                cached.expires_at = time.time() + (lifetime or 0)
+                cached.etag = response.headers.get("etag", cached.etag)
+                cached.last_modified = response.headers.get(
+                    "last-modified", cached.last_modified
                 )
+                await cache.set(cache_key, cached)
+                return cached.response.model_copy(deep=True)
 
-                response.raise_for_status()
+            response.raise_for_status()
 
-                content_type = response.headers.get("content-type", "")
-                body = None
-                if "application/json" in content_type:
-                    try:
-                        body = response.json()
-                    except ValueError:
-                        # JSON decoding failed, leave body as None
-                        pass
+            content_type = response.headers.get("content-type", "")
+            body = None
+            if "application/json" in content_type:
+                try:
+                    body = response.json()
+                except ValueError:
+                    # JSON decoding failed, leave body as None
+                    pass
 
-                return ResponseObject(
-                    status_code=response.status_code,
-                    headers=dict(response.headers),
-                    text=response.text,
-                    content=response.content,
-                    body=body,
+            response_obj = ResponseObject(
+                status_code=response.status_code,
+                headers=dict(response.headers),
+                text=response.text,
+                content=response.content,
+                body=body,
+            )
+
+            if cache:
+                lifetime = _cache_lifetime(response.headers, self.cache_ttl)
+                etag = response.headers.get("etag")
+                last_modified = response.headers.get("last-modified")
+                # Responses that are stale at once are only worth keeping to revalidate
+                if lifetime is not None and (lifetime or etag or last_modified):
+                    await cache.set(
+                        cache_key,
+                        CachedResponse(
+                            response_obj.model_copy(deep=True),
+                            expires_at=time.time() + lifetime,
+                            etag=etag,
+                            last_modified=last_modified,
+                        ),
+                    )
+
+            return response_obj
+
+        except httpx.RequestError as e:
+            raise HTTPError(f"Network error occurred: {str(e)}")
+        except httpx.HTTPStatusError as e:
+            response_obj = ResponseObject(
+                status_code=e.response.status_code,
+                headers=dict(e.response.headers),
+                text=e.response.text,
+                content=e.response.content,
+                body=None,
+            )
+            raise HTTPError(
+                f"HTTP error occurred: {str(e)}",
+                e.response.status_code,
+                response_obj,
+            )
+        except Exception as e:
+            raise HTTPError(f"Unexpected error occurred: {str(e)}")
+
+    async def _fetch(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        """Sends a request, retrying and hedging idempotent requests if configured"""
+        pooled = self._get_client(url)
+        idempotent = method in IDEMPOTENT_METHODS
+        attempts = self.max_retries + 1 if idempotent else 1
+
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+
+        def remaining() -> float | None:
+            if self.latency_budget is None:
+                return None
+            return self.latency_budget - (loop.time() - start)
+
+        attempt = 0
+        while True:
+            response: httpx.Response | None = None
+            error: httpx.TransportError | None = None
+            try:
+                response = await asyncio.wait_for(
+                    self._attempt(pooled, idempotent, method, url, **kwargs),
+                    remaining(),
+                )
+            except asyncio.TimeoutError:
+                raise httpx.TimeoutException(
+                    f"Latency budget of {self.latency_budget}s exceeded"
                 )
+            except httpx.TransportError as e:
+                error = e
+
+            attempt += 1
+            if response is not None and response.status_code not in RETRY_STATUS_CODES:
+                return response
+
+            delay = random.uniform(0, self.retry_backoff * 2 ** (attempt - 1))
+            budget_left = remaining()
+            if attempt >= attempts or (
+                budget_left is not None and delay >= budget_left
+            ):
+                if response is not None:
+                    return response
+                assert error is not None
+                raise error
+
+            await asyncio.sleep(delay)
+
+    async def _attempt(
+        self, pooled: _PooledClient, idempotent: bool, method: str, url: str, **kwargs
+    ) -> httpx.Response:
+        latencies = host_latencies.setdefault(pooled.key.origin, LatencyHistogram())
+
+        async def send() -> httpx.Response:
+            pooled.requests += 1
+            start = time.perf_counter()
+            response = await pooled.client.request(
+                method=method,
+                url=url,
+                extensions={"trace": pooled.trace},
+                **kwargs,
+            )
+            latencies.record(time.perf_counter() - start)
+            return response
+
+        if not (self.hedge and idempotent):
+            return await send()
 
-            except httpx.RequestError as e:
-                raise HTTPError(f"Network error occurred: {str(e)}")
-            except httpx.HTTPStatusError as e:
-                response_obj = ResponseObject(
-                    status_code=e.response.status_code,
-                    headers=dict(e.response.headers),
-                    text=e.response.text,
-                    content=e.response.content,
-                    body=None,
+        deadline = latencies.percentile(self.hedge_percentile)
+        pending = {asyncio.ensure_future(send())}
+        try:
+            done, pending = await asyncio.wait(
+                pending, timeout=self.hedge_delay if deadline is None else deadline
+            )
+            if done:
+                return done.pop().result()
+
+            pending.add(asyncio.ensure_future(send()))
+            while True:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
                 )
-                raise HTTPError(
-                    f"HTTP error occurred: {str(e)}",
-                    e.response.status_code,
-                    response_obj,
+                for task in done:
+                    # Use the first request that succeeds, or the last error
+                    if not task.exception() or not pending:
+                        return task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def _get_response_cache(self) -> HTTPResponseCache:
+        return get_response_cache(
+            self.cache_max_entries, self.cache_dir, self.cache_max_disk_entries
+        )
+
+
+@metadata(
+    description="Performs an HTTP request and sends the response body as it arrives, as byte chunks, lines, NDJSON objects or server-sent events",
+    category=BlockCategory.FUNCTION,
+)
+class HTTPStreamRequest(HTTPClientConfig, Block):
+    format: Annotated[StreamFormat, Config()] = StreamFormat.LINES
+    # Size of each chunk in bytes format, None sends data as it arrives
+    chunk_size: Annotated[int | None, Config()] = None
+
+    method: Annotated[HTTPMethod, Config()] = HTTPMethod.GET
+    url: Annotated[str, Config()] = ""
+    headers: Annotated[dict[str, Any] | None, Config()] = None
+    query_params: Annotated[dict[str, Any] | None, Config()] = None
+    body: Annotated[dict[str, Any] | None, Config()] = None
+
+    chunk: OutputChannel[Any]
+
+    @step()
+    async def make_request(
+        self,
+        request: Annotated[
+            RequestObject,
+            Metadata(
+                description="Can accept request parameters (method, url, headers, query_params, and/or body). Any values not specified will use the Config values. Pass an empty dict ({}) to use all Config values"
+            ),
+        ],
+    ):
+        # Helper to get the effective value from request or config
+        def get_effective_value(attr: str):
+            return getattr(request, attr) or getattr(self, attr)
+
+        try:
+            url = get_effective_value("url")
+            if not url:
+                raise ValueError("URL is required")
+
+            method = get_effective_value("method")
+            pooled = self._get_client(url)
+            pooled.requests += 1
+
+            # Sending on a channel does not wait for the item to be consumed, so a
+            # response that arrives faster than it is consumed is buffered in memory
+            async with pooled.client.stream(
+                method=method,
+                url=url,
+                headers=get_effective_value("headers") or {},
+                params=get_effective_value("query_params") or {},
+                json=get_effective_value("body")
+                if method in ["POST", "PUT", "PATCH"]
+                else None,
+                extensions={"trace": pooled.trace},
+            ) as response:
+                if response.is_error:
+                    await response.aread()
+                    raise HTTPError(
+                        f"HTTP error occurred: {response.status_code}",
+                        response.status_code,
+                        ResponseObject(
+                            status_code=response.status_code,
+                            headers=dict(response.headers),
+                            text=response.text,
+                            content=response.content,
+                            body=None,
+                        ),
+                    )
+
+                async for item in self._iter_items(response):
+                    self.chunk.send(item)
+
+        except HTTPError:
+            raise
+        except httpx.RequestError as e:
+            raise HTTPError(f"Network error occurred: {str(e)}")
+        except Exception as e:
+            raise HTTPError(f"Unexpected error occurred: {str(e)}")
+        finally:
+            self.chunk.close()
+
+    async def _iter_items(self, response: httpx.Response) -> AsyncIterator[Any]:
+        if self.format == StreamFormat.BYTES:
+            async for data in response.aiter_bytes(self.chunk_size):
+                yield data
+
+        elif self.format == StreamFormat.LINES:
+            async for line in response.aiter_lines():
+                yield line
+
+        elif self.format == StreamFormat.NDJSON:
+            async for line in response.aiter_lines():
+                if line.strip():
+                    yield json.loads(line)
+
+        elif self.format == StreamFormat.SSE:
+            async for event in _iter_sse(response.aiter_lines()):
+                yield event
+
+        else:
+            raise ValueError(f"Invalid format '{self.format}'")
+
+
+async def _iter_sse(lines: AsyncIterator[str]) -> AsyncIterator[SSEEvent]:
+    """Parses server-sent events, as described in the HTML event stream spec"""
+    event = "message"
+    data: list[str] = []
+    event_id: str | None = None
+    retry: int | None = None
+
+    async for line in lines:
+        if not line:
+            if data:
+                yield SSEEvent(
+                    event=event, data="\n".join(data), id=event_id, retry=retry
                 )
-            except Exception as e:
-                raise HTTPError(f"Unexpected error occurred: {str(e)}")
+            event, data, retry = "message", [], None
+            continue
+
+        if line.startswith(":"):
+            continue
+
+        name, _, value = line.partition(":")
+        value = value.removeprefix(" ")
+
+        if name == "event":
+            event = value
+        elif name == "data":
+            data.append(value)
+        elif name == "id":
+            event_id = value
+        elif name == "retry" and value.isdigit():
+            retry = int(value)
+
+    if data:
+        yield SSEEvent(event=event, data="\n".join(data), id=event_id, retry=retry)
@@ -1,15 +1,33 @@
+from functools import lru_cache
 from typing import Annotated, Any
 
-from jinja2 import BaseLoader, Environment
+from jinja2 import BaseLoader, Environment, Template
+from jinja2.sandbox import SandboxedEnvironment
 
 from smartspace.core import (
     Block,
     Config,
+    OutputChannel,
     metadata,
     step,
 )
 from smartspace.enums import BlockCategory
 
+TEMPLATE_CACHE_SIZE = 256
+
+_environment = Environment(loader=BaseLoader())
+_sandboxed_environment = SandboxedEnvironment(loader=BaseLoader())
+
+
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def get_template(source: str, sandboxed: bool = False) -> Template:
+    """
+    Compiles a template in a shared environment.
+    Compiled templates are cached by their source, so each template is compiled once.
+    """
+    environment = _sandboxed_environment if sandboxed else _environment
+    return environment.from_string(source)
+
 
 @metadata(
     description="Takes in a Jinja template string and renders it with the given inputs",
@@ -17,8 +35,42 @@ from smartspace.enums import BlockCategory
 )
 class StringTemplate(Block):
     template: Annotated[str, Config()]
+    sandboxed: Annotated[bool, Config()] = False
 
     @step(output_name="string")
     async def build(self, **inputs: Any) -> str:
-        template = Environment(loader=BaseLoader()).from_string(self.template)
+        template = get_template(self.template, self.sandboxed)
         return template.render(**inputs)
+
+
+@metadata(
+    description="Takes in a Jinja template string and renders it once for each set of inputs in a list",
+    category=BlockCategory.MISC,
+)
+class StringTemplateBatch(Block):
+    template: Annotated[str, Config()]
+    sandboxed: Annotated[bool, Config()] = False
+
+    @step(output_name="strings")
+    async def build(self, inputs: list[dict[str, Any]]) -> list[str]:
+        template = get_template(self.template, self.sandboxed)
+        return [template.render(**item) for item in inputs]
+
+
+@metadata(
+    description="Takes in a Jinja template string, renders it once for each set of inputs in a list and sends each string as soon as it is rendered",
+    category=BlockCategory.MISC,
+)
+class StringTemplateStream(Block):
+    template: Annotated[str, Config()]
+    sandboxed: Annotated[bool, Config()] = False
+
+    string: OutputChannel[str]
+
+    @step()
+    async def build(self, inputs: list[dict[str, Any]]):
+        template = get_template(self.template, self.sandboxed)
+        for item in inputs:
+            self.string.send(template.render(**item))
+
+        self.string.close()
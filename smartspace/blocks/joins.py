@@ -0,0 +1,258 @@
+from enum import Enum
+from typing import Any, Callable, Iterator, Sequence
+
+from smartspace.blocks.columnar import get_row, is_columnar, row_count
+
+
+class JoinType(Enum):
+    INNER = "inner"
+    OUTER = "outer"
+    LEFT_INNER = "left_inner"
+    LEFT_OUTER = "left_outer"
+    RIGHT_INNER = "right_inner"
+    RIGHT_OUTER = "right_outer"
+
+
+class JoinStrategy(Enum):
+    # Indexes the smaller input and looks up the rows of the larger one
+    HASH = "hash"
+    # Walks both inputs in step, they must already be sorted by the key
+    SORT_MERGE = "sort_merge"
+
+
+# Join types that keep rows with no match, as (left, right)
+_UNMATCHED = {
+    JoinType.INNER: (False, False),
+    JoinType.OUTER: (True, True),
+    JoinType.LEFT_OUTER: (True, False),
+    JoinType.RIGHT_OUTER: (False, True),
+}
+
+
+def keeps_unmatched(join_type: JoinType) -> tuple[bool, bool]:
+    """Whether the join keeps left and right rows that have no match"""
+    return _UNMATCHED.get(join_type, (False, False))
+
+
+class JoinInput:
+    """
+    The rows of one side of a join, a list of records or a columnar table.
+    Rows of a columnar table are only built when they are read, and keys are
+    read one row at a time. A row whose key has a missing or None field never matches.
+    """
+
+    def __init__(
+        self,
+        records: list[dict[str, Any]] | dict[str, Any],
+        key: Sequence[str],
+        side: str,
+    ):
+        if is_columnar(records):
+            for field in key:
+                if field not in records["data"]:
+                    raise KeyError(f"{side} table does not contain the key '{field}'")
+
+            table = records
+            self.key: Callable[[int], Any] = _column_key_getter(
+                [table["data"][field] for field in key]
+            )
+            self.row: Callable[[int], dict[str, Any]] = lambda i: get_row(table, i)
+            self.count = row_count(table)
+        else:
+            get_key = key_getter(key)
+            self.key = lambda i: get_key(records[i])
+            self.row = records.__getitem__
+            self.count = len(records)
+
+    def keys(self) -> Iterator[Any]:
+        return map(self.key, range(self.count))
+
+
+def _column_key_getter(columns: list[list[Any]]) -> Callable[[int], Any]:
+    if len(columns) == 1:
+        return columns[0].__getitem__
+
+    def get_key(i: int) -> Any:
+        values = tuple(column[i] for column in columns)
+        return None if None in values else values
+
+    return get_key
+
+
+def key_getter(key: Sequence[str]) -> Callable[[dict[str, Any]], Any]:
+    """Returns the key of a record, a tuple for composite keys, or None when a field is missing"""
+    if len(key) == 1:
+        field = key[0]
+        return lambda item: item.get(field)
+
+    def get_key(item: dict[str, Any]) -> Any:
+        values = tuple(item.get(field) for field in key)
+        return None if None in values else values
+
+    return get_key
+
+
+def join_rows(
+    left: JoinInput,
+    right: JoinInput,
+    join_type: JoinType,
+    strategy: JoinStrategy = JoinStrategy.HASH,
+) -> Iterator[dict[str, Any]]:
+    """
+    Joins the rows of two inputs, every pair of matching rows gives one merged row.
+    LEFT_INNER and RIGHT_INNER give each row of their side that has a match, once.
+    """
+    if strategy == JoinStrategy.SORT_MERGE:
+        return _merge_join(left, right, join_type)
+
+    if join_type == JoinType.LEFT_INNER:
+        return _semi_join(left, right)
+    if join_type == JoinType.RIGHT_INNER:
+        return _semi_join(right, left)
+
+    return _hash_join(left, right, join_type)
+
+
+def _semi_join(rows: JoinInput, other: JoinInput) -> Iterator[dict[str, Any]]:
+    keys = set(k for k in other.keys() if k is not None)
+    for i, key in enumerate(rows.keys()):
+        if key is not None and key in keys:
+            yield rows.row(i)
+
+
+def _hash_join(
+    left: JoinInput, right: JoinInput, join_type: JoinType
+) -> Iterator[dict[str, Any]]:
+    keep_left, keep_right = keeps_unmatched(join_type)
+
+    # Rows come out in the order of the larger input, the probe side
+    build_left = left.count < right.count
+    build, probe = (left, right) if build_left else (right, left)
+    keep_build, keep_probe = (
+        (keep_left, keep_right) if build_left else (keep_right, keep_left)
+    )
+
+    buckets: dict[Any, list[int]] = {}
+    for i, key in enumerate(build.keys()):
+        if key is not None:
+            buckets.setdefault(key, []).append(i)
+
+    matched: set[int] = set()
+    for i, key in enumerate(probe.keys()):
+        indexes = buckets.get(key) if key is not None else None
+        if not indexes:
+            if keep_probe:
+                yield probe.row(i)
+            continue
+
+        probe_row = probe.row(i)
+        for j in indexes:
+            if build_left:
+                yield {**build.row(j), **probe_row}
+            else:
+                yield {**probe_row, **build.row(j)}
+
+        if keep_build:
+            matched.update(indexes)
+
+    if keep_build:
+        for j in range(build.count):
+            if j not in matched:
+                yield build.row(j)
+
+
+def _merge_join(
+    left: JoinInput, right: JoinInput, join_type: JoinType
+) -> Iterator[dict[str, Any]]:
+    """
+    Walks both inputs in step, so besides the inputs themselves only the rows
+    of the current key are held. Inputs are checked to be sorted as they are read.
+    """
+    keep_left, keep_right = keeps_unmatched(join_type)
+
+    left_cursor = _MergeCursor(left, "Left")
+    right_cursor = _MergeCursor(right, "Right")
+
+    while not left_cursor.done or not right_cursor.done:
+        left_key, right_key = left_cursor.key, right_cursor.key
+
+        # Rows without a key never match, nor do rows past the end of the other input
+        if not left_cursor.done and (
+            left_key is None
+            or right_cursor.done
+            or (right_key is not None and left_key < right_key)
+        ):
+            if keep_left:
+                yield left.row(left_cursor.index)
+            left_cursor.advance()
+            continue
+        if not right_cursor.done and (
+            right_key is None or left_cursor.done or right_key < left_key
+        ):
+            if keep_right:
+                yield right.row(right_cursor.index)
+            right_cursor.advance()
+            continue
+
+        # Both sides are at the same key, join the runs of rows that have it.
+        # Rows without a key inside a run are passed over as unmatched
+        left_run, left_keyless = left_cursor.take_run(left_key)
+        right_run, right_keyless = right_cursor.take_run(right_key)
+
+        if join_type == JoinType.LEFT_INNER:
+            yield from (left.row(a) for a in left_run)
+        elif join_type == JoinType.RIGHT_INNER:
+            yield from (right.row(b) for b in right_run)
+        else:
+            right_rows = [right.row(b) for b in right_run]
+            for a in left_run:
+                left_row = left.row(a)
+                yield from ({**left_row, **right_row} for right_row in right_rows)
+
+        if keep_left:
+            yield from (left.row(a) for a in left_keyless)
+        if keep_right:
+            yield from (right.row(b) for b in right_keyless)
+
+
+class _MergeCursor:
+    """The position in one input of a sort merge join and the key of that row"""
+
+    def __init__(self, rows: JoinInput, side: str):
+        self.rows = rows
+        self.side = side
+        self.index = 0
+        self.previous: Any = None
+        self.key = self._read()
+
+    @property
+    def done(self) -> bool:
+        return self.index >= self.rows.count
+
+    def advance(self):
+        self.index += 1
+        self.key = self._read()
+
+    def take_run(self, key: Any) -> tuple[list[int], list[int]]:
+        """Moves past the rows that have the key, or no key, returning both sets of indexes"""
+        run: list[int] = []
+        keyless: list[int] = []
+        while not self.done and (self.key is None or self.key == key):
+            (run if self.key is not None else keyless).append(self.index)
+            self.advance()
+
+        return run, keyless
+
+    def _read(self) -> Any:
+        if self.done:
+            return None
+
+        key = self.rows.key(self.index)
+        if key is not None:
+            if self.previous is not None and key < self.previous:
+                raise ValueError(
+                    f"{self.side} row {self.index} is out of order, sort merge joins need inputs sorted by the key"
+                )
+            self.previous = key
+
+        return key
@@ -1,19 +1,138 @@
+import asyncio
+from collections import deque
 from enum import Enum
+from functools import lru_cache
+from itertools import islice
 import json
-from typing import Annotated, Any, List, Union
+import re
+from typing import Annotated, Any, Callable, Iterator, List, Union
 
-from jsonpath_ng import JSONPath
-from jsonpath_ng.ext import parse
-from pydantic import BaseModel
+from more_itertools import chunked
+from pydantic import BaseModel, TypeAdapter
 
+from smartspace.blocks.columnar import (
+    is_columnar,
+    iter_rows,
+    rows_to_columnar,
+)
+from smartspace.blocks.joins import (
+    JoinInput,
+    JoinStrategy,
+    JoinType,
+    join_rows,
+    key_getter,
+    keeps_unmatched,
+)
+from smartspace.blocks.json_path import compile_path, compile_paths
+from smartspace.blocks.spans import resolve_spans
 from smartspace.core import (
     Block,
     Config,
+    InputChannel,
     Metadata,
+    Output,
+    OutputChannel,
+    State,
     metadata,
     step,
 )
-from smartspace.enums import BlockCategory
+from smartspace.enums import BlockCategory, ChannelEvent
+
+
+class JsonParser(Enum):
+    JSON = "json"
+    # orjson is faster but is an optional dependency
+    ORJSON = "orjson"
+
+
+class JsonFormat(Enum):
+    # A JSON document, the items of a top level array are sent one at a time
+    JSON = "json"
+    # Newline delimited JSON, one document per line
+    NDJSON = "ndjson"
+
+
+def get_loads(parser: JsonParser) -> Callable[[str], Any]:
+    if parser == JsonParser.ORJSON:
+        try:
+            import orjson
+        except ImportError as e:
+            raise ImportError(
+                "The orjson parser requires the orjson package, install it with `pip install orjson`"
+            ) from e
+
+        return orjson.loads
+
+    return json.loads
+
+
+# Items sent by ParseJsonStream between yields to the event loop
+PARSE_YIELD_INTERVAL = 100
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+
+
+def iter_json_items(
+    text: str, format: JsonFormat, parser: JsonParser = JsonParser.JSON
+) -> Iterator[Any]:
+    """
+    Parses the lines of NDJSON, or the items of a top level JSON array, one at a
+    time. Any other JSON document is a single item.
+    """
+    loads = get_loads(parser)
+
+    if format == JsonFormat.NDJSON:
+        start = 0
+        while start < len(text):
+            end = text.find("\n", start)
+            if end == -1:
+                end = len(text)
+            line = text[start:end]
+            if line.strip():
+                yield loads(line)
+            start = end + 1
+        return
+
+    start = len(text) - len(text.lstrip(_WHITESPACE))
+    if not text.startswith("[", start) or parser != JsonParser.JSON:
+        # orjson can only parse whole documents
+        value = loads(text)
+        if isinstance(value, list) and text.startswith("[", start):
+            yield from value
+        else:
+            yield value
+        return
+
+    position = _skip_whitespace(text, start + 1)
+    if text.startswith("]", position):
+        _end_of_document(text, position + 1)
+        return
+
+    while True:
+        item, position = _decoder.raw_decode(text, position)
+        yield item
+
+        position = _skip_whitespace(text, position)
+        if text.startswith(",", position):
+            position = _skip_whitespace(text, position + 1)
+        elif text.startswith("]", position):
+            _end_of_document(text, position + 1)
+            return
+        else:
+            raise json.JSONDecodeError("Expecting ',' delimiter", text, position)
+
+
+def _skip_whitespace(text: str, position: int) -> int:
+    while position < len(text) and text[position] in _WHITESPACE:
+        position += 1
+    return position
+
+
+def _end_of_document(text: str, position: int):
+    position = _skip_whitespace(text, position)
+    if position != len(text):
+        raise json.JSONDecodeError("Extra data", text, position)
 
 
 @metadata(
@@ -21,6 +140,8 @@ from smartspace.enums import BlockCategory
     category=BlockCategory.FUNCTION,
 )
 class ParseJson(Block):
+    parser: Annotated[JsonParser, Config()] = JsonParser.JSON
+
     @step(output_name="json")
     async def parse_json(
         self,
@@ -29,14 +150,79 @@ class ParseJson(Block):
             Metadata(description="JSON string or list of JSON strings"),
         ],
     ) -> dict[str, Any] | list[dict[str, Any]]:
+        loads = get_loads(self.parser)
         if isinstance(json_string, list):
-            results: list[Any] = [json.loads(item) for item in json_string]
+            results: list[Any] = [loads(item) for item in json_string]
             return results
         else:
-            result = json.loads(json_string)
+            result = loads(json_string)
             return result
 
 
+@metadata(
+    description="Parses NDJSON, or a JSON array, and sends each item as it is parsed. A list of strings is parsed in worker threads and the items of each string are sent in order",
+    category=BlockCategory.FUNCTION,
+)
+class ParseJsonStream(Block):
+    format: Annotated[JsonFormat, Config()] = JsonFormat.JSON
+    parser: Annotated[JsonParser, Config()] = JsonParser.JSON
+    # Strings from a list that are parsed at the same time
+    concurrency: Annotated[int, Config()] = 4
+
+    item: OutputChannel[Any]
+
+    @step()
+    async def parse_json(
+        self,
+        json_string: Annotated[
+            Union[str, List[str]],
+            Metadata(description="JSON string or list of JSON strings"),
+        ],
+    ):
+        try:
+            if isinstance(json_string, str):
+                items = iter_json_items(json_string, self.format, self.parser)
+                for count, item in enumerate(items, 1):
+                    self.item.send(item)
+                    if count % PARSE_YIELD_INTERVAL == 0:
+                        # Parsing a long string should not hold up the event loop
+                        await asyncio.sleep(0)
+                return
+
+            semaphore = asyncio.Semaphore(max(self.concurrency, 1))
+
+            async def parse(text: str) -> list[Any]:
+                async with semaphore:
+                    return await asyncio.to_thread(
+                        lambda: list(iter_json_items(text, self.format, self.parser))
+                    )
+
+            # Only `concurrency` strings are parsed ahead of the one being sent,
+            # so parsed items are not held for the whole list at once
+            texts = iter(json_string)
+            tasks: deque[asyncio.Future[list[Any]]] = deque(
+                asyncio.ensure_future(parse(text))
+                for text in islice(texts, max(self.concurrency, 1))
+            )
+            try:
+                while tasks:
+                    items = await tasks.popleft()
+                    for text in islice(texts, 1):
+                        tasks.append(asyncio.ensure_future(parse(text)))
+
+                    for count, item in enumerate(items, 1):
+                        self.item.send(item)
+                        if count % PARSE_YIELD_INTERVAL == 0:
+                            await asyncio.sleep(0)
+                    # Release the sent items before waiting on the next string
+                    del items
+            finally:
+                for task in tasks:
+                    task.cancel()
+        finally:
+            self.item.close()
+
+
 @metadata(
     category=BlockCategory.FUNCTION,
     description="Uses JSONPath to extract data from a JSON object or list",
@@ -48,17 +234,33 @@ class GetJsonField(Block):
     @step(output_name="field")
     async def get(self, json_object: Any) -> Any:
         if isinstance(json_object, BaseModel):
-            json_object = json.loads(json_object.model_dump_json())
+            json_object = json_object.model_dump(mode="json")
         elif isinstance(json_object, list) and all(
             isinstance(item, BaseModel) for item in json_object
         ):
-            json_object = [json.loads(item.model_dump_json()) for item in json_object]
+            json_object = _dump_models(json_object)
 
-        jsonpath_expr: JSONPath = parse(self.json_field_structure)
-        results: List[Any] = [match.value for match in jsonpath_expr.find(json_object)]
+        results: List[Any] = compile_path(self.json_field_structure)(json_object)
         return results
 
 
+def _dump_models(models: list[BaseModel]) -> list[Any]:
+    # Dumps the whole list in one call when every model has the same type
+    model_types = {type(model) for model in models}
+    if len(model_types) == 1:
+        return _list_adapter(model_types.pop()).dump_python(models, mode="json")
+
+    return [model.model_dump(mode="json") for model in models]
+
+
+@lru_cache(maxsize=None)
+def _list_adapter(model_type: type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(list[model_type])  # type: ignore
+
+
+_COLUMN_PATH = re.compile(r"^\$\[\*\]\.([A-Za-z_][A-Za-z0-9_]*)$")
+
+
 @metadata(
     category=BlockCategory.FUNCTION,
     description="Uses JSONPath to extract data from a JSON object or list.\nJSONPath implementation is from https://pypi.org/project/jsonpath-ng/",
@@ -67,13 +269,84 @@ class Get(Block):
     path: Annotated[str, Config()]
 
     @step(output_name="result")
-    async def get(self, data: list[Any] | dict[str, Any]) -> Any:
-        jsonpath_expr: JSONPath = parse(self.path)
+    async def get(
+        self,
+        data: list[Any] | dict[str, Any],
+        text: Annotated[
+            str | list[str] | None,
+            Metadata(
+                description="Original text that chunk spans in data point into. When given, any spans in the result are replaced with their text"
+            ),
+        ] = None,
+    ) -> Any:
+        if is_columnar(data):
+            # Columnar tables are queried as their list of rows, a path that
+            # selects one field of every row reads the column directly
+            column = _COLUMN_PATH.match(self.path)
+            if column and column.group(1) in data["data"]:
+                result = list(data["data"][column.group(1)])
+                return result if text is None else resolve_spans(result, text)
+
+            data = list(iter_rows(data))
+
+        find = compile_path(self.path)
         if isinstance(data, list):
-            return [match.value for match in jsonpath_expr.find(data)]
+            result: Any = find(data)
         else:
-            results = [match.value for match in jsonpath_expr.find(data)]
-            return None if not len(results) else results[0]
+            results = find(data)
+            result = None if not len(results) else results[0]
+
+        return result if text is None else resolve_spans(result, text)
+
+
+@metadata(
+    category=BlockCategory.FUNCTION,
+    description="Uses JSONPath to extract several values from a JSON object or list in one pass.\nEach configured path is sent to the output with the same name",
+)
+class GetMany(Block):
+    paths: Annotated[dict[str, str], Config()]
+
+    results: dict[str, Output[Any]]
+
+    @step()
+    async def get(
+        self,
+        data: list[Any] | dict[str, Any],
+        text: Annotated[
+            str | list[str] | None,
+            Metadata(
+                description="Original text that chunk spans in data point into. When given, any spans in the results are replaced with their text"
+            ),
+        ] = None,
+    ):
+        paths = {
+            name: path for name, path in self.paths.items() if name in self.results
+        }
+        values: dict[str, Any] = {}
+
+        if is_columnar(data):
+            # Same as Get, paths that select one field of every row read the column
+            for name, path in list(paths.items()):
+                column = _COLUMN_PATH.match(path)
+                if column and column.group(1) in data["data"]:
+                    values[name] = list(data["data"][column.group(1)])
+                    del paths[name]
+
+            if paths:
+                data = list(iter_rows(data))
+
+        if paths:
+            matches = compile_paths(paths)(data)
+            for name, results in matches.items():
+                if isinstance(data, list):
+                    values[name] = results
+                else:
+                    values[name] = None if not len(results) else results[0]
+
+        for name, value in values.items():
+            self.results[name].send(
+                value if text is None else resolve_spans(value, text)
+            )
 
 
 @metadata(
@@ -111,15 +384,6 @@ class MergeLists(Block):
 
 
 
-class JoinType(Enum):
-    INNER = 'inner'    
-    OUTER = 'outer'
-    LEFT_INNER = 'left_inner'
-    LEFT_OUTER = 'left_outer'
-    RIGHT_INNER = 'right_inner'
-    RIGHT_OUTER = 'right_outer'
-
-
 @metadata(
     category=BlockCategory.FUNCTION,
     description="""
@@ -128,9 +392,10 @@ The `Join` block performs advanced join operations between two lists of dictiona
 **Key Features**:
 
 - **Flexible Join Types**: Supports multiple join types, including `INNER`, `LEFT_INNER`, `LEFT_OUTER`, `RIGHT_INNER`, `RIGHT_OUTER`, and `OUTER`.
-- **Customizable Key**: Allows specification of the join key.
-- **Data Merging**: Combines fields from both left and right records where applicable.
-- **Error Handling**: Ensures all records contain the specified key.
+- **Customizable Key**: Allows specification of the join key, or a list of fields for a composite key.
+- **Data Merging**: Combines fields from both left and right records where applicable. A record that matches several records on the other side gives one merged record for each of them.
+- **Missing Keys**: Records that do not contain the key never match, outer joins keep them unmerged.
+- **Join Strategies**: `HASH` indexes the smaller list. `SORT_MERGE` walks both lists in step and, besides the lists themselves, only holds the records of one key at a time. Both lists must already be sorted by the key.
 
 **Supported Join Types**:
 
@@ -145,65 +410,206 @@ The `Join` block performs advanced join operations between two lists of dictiona
 
 - Merging datasets from different sources.
 - Performing SQL-like join operations in Python.
-"""
+""",
 )
 class Join(Block):
-    key: Annotated[str, Config()]
+    key: Annotated[str | list[str], Config()]
     joinType: Annotated[JoinType, Config()] = JoinType.INNER
+    strategy: Annotated[JoinStrategy, Config()] = JoinStrategy.HASH
 
     @step(output_name="result")
     async def Join(
         self,
-        left: list[dict[str, Any]],
-        right: list[dict[str, Any]],
-    ) -> list[dict[str, Any]]:
-        # Create dictionaries mapping key values to records
-        left_dict = {}
-        for item in left:
-            key_value = item.get(self.key)
-            if key_value is None:
-                raise KeyError(f"Left item {item} does not contain the key '{self.key}'")
-            left_dict[key_value] = item
-
-        right_dict = {}
-        for item in right:
-            key_value = item.get(self.key)
-            if key_value is None:
-                raise KeyError(f"Right item {item} does not contain the key '{self.key}'")
-            right_dict[key_value] = item
-
-        # Determine the keys to include based on the join type
-        if self.joinType == JoinType.INNER:
-            keys = set(left_dict.keys()) & set(right_dict.keys())
-        elif self.joinType == JoinType.LEFT_INNER:
-            keys = set(k for k in left_dict.keys() if k in right_dict)
-        elif self.joinType == JoinType.LEFT_OUTER:
-            keys = set(left_dict.keys())
-        elif self.joinType == JoinType.RIGHT_INNER:
-            keys = set(k for k in right_dict.keys() if k in left_dict)
-        elif self.joinType == JoinType.RIGHT_OUTER:
-            keys = set(right_dict.keys())
-        elif self.joinType == JoinType.OUTER:
-            keys = set(left_dict.keys()) | set(right_dict.keys())
-        else:
-            raise ValueError(f"Invalid joinType '{self.joinType}'. Must be one of JoinType.")
-
-        # Merge the records based on the keys
-        result = []
-        for key in keys:
-            merged_item = {}
-            left_item = left_dict.get(key)
-            right_item = right_dict.get(key)
-
-            if self.joinType in (JoinType.LEFT_OUTER, JoinType.LEFT_INNER, JoinType.INNER, JoinType.OUTER):
-                if left_item:
-                    merged_item.update(left_item)
-            if self.joinType in (JoinType.RIGHT_OUTER, JoinType.RIGHT_INNER, JoinType.INNER, JoinType.OUTER):
-                if right_item:
-                    merged_item.update(right_item)
-
-            # Only include items that have data
-            if merged_item:
-                result.append(merged_item)
+        left: Annotated[
+            list[dict[str, Any]] | dict[str, Any],
+            Metadata(description="List of records or a columnar table"),
+        ],
+        right: Annotated[
+            list[dict[str, Any]] | dict[str, Any],
+            Metadata(description="List of records or a columnar table"),
+        ],
+    ) -> list[dict[str, Any]] | dict[str, Any]:
+        key = [self.key] if isinstance(self.key, str) else self.key
+        result = list(
+            join_rows(
+                JoinInput(left, key, "Left"),
+                JoinInput(right, key, "Right"),
+                self.joinType,
+                self.strategy,
+            )
+        )
+
+        if is_columnar(left) and is_columnar(right):
+            return rows_to_columnar(result)
 
         return result
+
+
+@metadata(
+    category=BlockCategory.FUNCTION,
+    description="Joins two lists of records like the Join block and sends the joined records in batches as they are produced",
+)
+class JoinStream(Block):
+    key: Annotated[str | list[str], Config()]
+    joinType: Annotated[JoinType, Config()] = JoinType.INNER
+    strategy: Annotated[JoinStrategy, Config()] = JoinStrategy.HASH
+    batch_size: Annotated[int, Config()] = 1000  # Records in each batch
+
+    rows: OutputChannel[list[dict[str, Any]] | dict[str, Any]]
+
+    @step()
+    async def Join(
+        self,
+        left: Annotated[
+            list[dict[str, Any]] | dict[str, Any],
+            Metadata(description="List of records or a columnar table"),
+        ],
+        right: Annotated[
+            list[dict[str, Any]] | dict[str, Any],
+            Metadata(description="List of records or a columnar table"),
+        ],
+    ):
+        key = [self.key] if isinstance(self.key, str) else self.key
+        columnar = is_columnar(left) and is_columnar(right)
+
+        try:
+            rows = join_rows(
+                JoinInput(left, key, "Left"),
+                JoinInput(right, key, "Right"),
+                self.joinType,
+                self.strategy,
+            )
+            for batch in chunked(rows, max(self.batch_size, 1)):
+                self.rows.send(rows_to_columnar(batch) if columnar else batch)
+        finally:
+            self.rows.close()
+
+
+@metadata(
+    category=BlockCategory.FUNCTION,
+    description="""
+Joins records that arrive over two channels, with the same join types as the `Join` block, so neither side has to be collected first.
+
+Records are kept in state by key and a joined record is sent as soon as both sides of a key have arrived. Once one channel closes, records from the other are joined or sent unmatched straight away without being kept, and when both channels close the unmatched records of outer joins are sent and the result channel is closed. State is then cleared, so records that arrive afterwards are joined from scratch.
+
+When each key appears at most once on each side, set `unique_keys` so matched records are dropped from state and it only holds records that are still waiting for a match.
+""",
+)
+class ChannelJoin(Block):
+    key: Annotated[str | list[str], Config()]
+    joinType: Annotated[JoinType, Config()] = JoinType.INNER
+    unique_keys: Annotated[bool, Config()] = False
+
+    result: OutputChannel[dict[str, Any]]
+
+    # Records waiting on each side by their JSON encoded key
+    left_rows: Annotated[dict[str, list[dict[str, Any]]], State()] = {}
+    right_rows: Annotated[dict[str, list[dict[str, Any]]], State()] = {}
+    # Keys of the waiting records that have been matched
+    left_matched: Annotated[dict[str, bool], State()] = {}
+    right_matched: Annotated[dict[str, bool], State()] = {}
+    left_closed: Annotated[bool, State()] = False
+    right_closed: Annotated[bool, State()] = False
+
+    @step()
+    async def left(self, left: InputChannel[dict[str, Any]]):
+        self._receive(left, "left", "right")
+
+    @step()
+    async def right(self, right: InputChannel[dict[str, Any]]):
+        self._receive(right, "right", "left")
+
+    def _receive(self, channel: InputChannel[dict[str, Any]], side: str, other: str):
+        # Work on copies so the class level state defaults are never mutated
+        for name in ("left_rows", "right_rows", "left_matched", "right_matched"):
+            setattr(self, name, dict(getattr(self, name)))
+
+        if channel.event == ChannelEvent.DATA and channel.data is not None:
+            self._add(channel.data, side, other)
+
+        if channel.event == ChannelEvent.CLOSE:
+            if getattr(self, f"{side}_closed"):
+                # The channel already closed in this round
+                return
+
+            setattr(self, f"{side}_closed", True)
+
+            # The waiting records of the other side have now seen every record
+            # they could match
+            self._flush(other)
+            if getattr(self, f"{other}_closed"):
+                self._flush(side)
+                self.result.close()
+
+                # Both channels are done, the next records start a new join
+                self.left_closed = False
+                self.right_closed = False
+
+    def _add(self, row: dict[str, Any], side: str, other: str):
+        key_fields = [self.key] if isinstance(self.key, str) else self.key
+        key_value = key_getter(key_fields)(row)
+        keep = self._keeps(side)
+        if key_value is None:
+            if keep:
+                self.result.send(row)
+            return
+
+        key = json.dumps(key_value)
+        rows: dict[str, list[dict[str, Any]]] = getattr(self, f"{side}_rows")
+        other_rows: dict[str, list[dict[str, Any]]] = getattr(self, f"{other}_rows")
+        other_closed = getattr(self, f"{other}_closed")
+        matches = other_rows.get(key)
+
+        if self.joinType in (JoinType.LEFT_INNER, JoinType.RIGHT_INNER):
+            semi_side = "left" if self.joinType == JoinType.LEFT_INNER else "right"
+            if side == semi_side:
+                if matches is not None:
+                    self.result.send(row)
+                elif not other_closed:
+                    rows.setdefault(key, []).append(row)
+            else:
+                # Waiting records of the kept side are sent once, then only the
+                # key is needed to match later ones
+                for waiting in matches or []:
+                    self.result.send(waiting)
+                if matches is not None:
+                    del other_rows[key]
+                if not other_closed:
+                    rows[key] = []
+            return
+
+        if matches:
+            for match in matches:
+                self.result.send(
+                    {**row, **match} if side == "left" else {**match, **row}
+                )
+            getattr(self, f"{other}_matched")[key] = True
+            if self.unique_keys:
+                del other_rows[key]
+                getattr(self, f"{other}_matched").pop(key, None)
+                return
+        elif other_closed:
+            if keep:
+                self.result.send(row)
+            return
+
+        if not other_closed:
+            rows.setdefault(key, []).append(row)
+            if matches:
+                getattr(self, f"{side}_matched")[key] = True
+
+    def _flush(self, side: str):
+        rows: dict[str, list[dict[str, Any]]] = getattr(self, f"{side}_rows")
+        matched: dict[str, bool] = getattr(self, f"{side}_matched")
+        if self._keeps(side):
+            for key, waiting in rows.items():
+                if key not in matched:
+                    for row in waiting:
+                        self.result.send(row)
+
+        setattr(self, f"{side}_rows", {})
+        setattr(self, f"{side}_matched", {})
+
+    def _keeps(self, side: str) -> bool:
+        keep_left, keep_right = keeps_unmatched(self.joinType)
+        return keep_left if side == "left" else keep_right
@@ -0,0 +1,154 @@
+import re
+from functools import lru_cache, partial
+from typing import Any, Callable, Mapping
+
+from jsonpath_ng import JSONPath
+from jsonpath_ng.ext import parse
+
+JSON_PATH_CACHE_SIZE = 1024
+
+# One step of a path with no filters, wildcards or slices: .name, [0], ['name'] or ["name"]
+_SIMPLE_STEP = re.compile(
+    r"\.([A-Za-z_][A-Za-z0-9_]*)|\[(-?\d+)\]|\['([^'\\]*)'\]|\[\"([^\"\\]*)\"\]"
+)
+# Names the jsonpath-ng lexer reads as keywords rather than fields
+_KEYWORDS = {"where", "wherenot", "true", "false"}
+_MISSING = object()
+
+
+@lru_cache(maxsize=JSON_PATH_CACHE_SIZE)
+def compile_path(path: str) -> Callable[[Any], list[Any]]:
+    """
+    Compiles a JSONPath into a function that returns the values it matches.
+    Simple paths such as $.a.b[0].c become a direct lookup, anything else is
+    evaluated with jsonpath-ng. Compiled paths are cached by path.
+    """
+    steps = _parse_simple(path)
+    if steps is None:
+        return partial(_find, parse(path))
+
+    return partial(_walk, steps)
+
+
+def compile_paths(paths: Mapping[str, str]) -> Callable[[Any], dict[str, list[Any]]]:
+    """
+    Compiles named JSONPaths into one function that returns the values each path
+    matches. Simple paths are merged into a trie so steps they share are walked
+    once per document. Compiled path sets are cached.
+    """
+    return _compile_paths(tuple(paths.items()))
+
+
+@lru_cache(maxsize=JSON_PATH_CACHE_SIZE)
+def _compile_paths(
+    paths: tuple[tuple[str, str], ...],
+) -> Callable[[Any], dict[str, list[Any]]]:
+    trie = _PathTrie()
+    others: dict[str, Callable[[Any], list[Any]]] = {}
+    for name, path in paths:
+        steps = _parse_simple(path)
+        if steps is None:
+            others[name] = compile_path(path)
+        else:
+            trie.add(name, steps)
+
+    return partial(_find_all, trie, others, tuple(name for name, _ in paths))
+
+
+class _PathTrie:
+    """Simple paths merged on their shared leading steps"""
+
+    def __init__(self):
+        self.names: list[str] = []
+        self.children: dict[tuple[bool, str | int], _PathTrie] = {}
+
+    def add(self, name: str, steps: tuple[tuple[bool, str | int], ...]):
+        node = self
+        for s in steps:
+            node = node.children.setdefault(s, _PathTrie())
+        node.names.append(name)
+
+    def walk(self, value: Any, results: dict[str, list[Any]]):
+        for name in self.names:
+            results[name] = [value]
+
+        for (is_index, key), child in self.children.items():
+            child_value = _step(value, is_index, key)
+            if child_value is not _MISSING:
+                child.walk(child_value, results)
+
+
+def _find_all(
+    trie: _PathTrie,
+    others: dict[str, Callable[[Any], list[Any]]],
+    names: tuple[str, ...],
+    data: Any,
+) -> dict[str, list[Any]]:
+    results: dict[str, list[Any]] = {name: [] for name in names}
+    trie.walk(data, results)
+    for name, find in others.items():
+        results[name] = find(data)
+
+    return results
+
+
+def _parse_simple(path: str) -> tuple[tuple[bool, str | int], ...] | None:
+    """Returns (is_index, key) steps for a simple path, or None for other paths"""
+    path = path.strip()
+    if not path.startswith("$"):
+        return None
+
+    steps: list[tuple[bool, str | int]] = []
+    position = 1
+    while position < len(path):
+        match = _SIMPLE_STEP.match(path, position)
+        if not match:
+            return None
+
+        name, index, single_quoted, double_quoted = match.groups()
+        if name is not None:
+            if name in _KEYWORDS:
+                return None
+            steps.append((False, name))
+        elif index is not None:
+            steps.append((True, int(index)))
+        else:
+            steps.append(
+                (False, single_quoted if single_quoted is not None else double_quoted)
+            )
+
+        position = match.end()
+
+    return tuple(steps)
+
+
+def _find(expression: JSONPath, data: Any) -> list[Any]:
+    return [match.value for match in expression.find(data)]
+
+
+def _walk(steps: tuple[tuple[bool, str | int], ...], data: Any) -> list[Any]:
+    value = data
+    for is_index, key in steps:
+        value = _step(value, is_index, key)
+        if value is _MISSING:
+            return []
+
+    return [value]
+
+
+def _step(value: Any, is_index: bool, key: str | int) -> Any:
+    # Follows the rules of jsonpath-ng's Fields and Index so both give the same matches
+    if is_index:
+        if isinstance(value, dict) or not value:
+            return _MISSING
+        try:
+            if not -len(value) <= key < len(value):  # type: ignore
+                return _MISSING
+        except TypeError:
+            return _MISSING
+        return value[key]
+
+    try:
+        return value.get(key, _MISSING)
+    except (TypeError, AttributeError):
+        return _MISSING
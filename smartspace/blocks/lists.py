@@ -1,7 +1,9 @@
+import time
 from typing import Annotated, Any, Generic, TypeVar
 
-from more_itertools import flatten
+from more_itertools import chunked, flatten
 
+from smartspace.blocks.columnar import concat_columnar, is_columnar, iter_rows
 from smartspace.core import (
     Block,
     ChannelEvent,
@@ -23,7 +25,7 @@ ResultT = TypeVar("ResultT")
 
 @metadata(
     category=BlockCategory.FUNCTION,
-    description="Loops through each item in the items input and sends them to the configured tool. Once all items have been processed, outputs the resulting list",
+    description="Loops through each item in the items input and sends them to the configured tool. Once all items have been processed, outputs the resulting list. Each result is also sent through the result channel as it arrives, in item order unless ordered is off. max_concurrency limits how many items are with the tool at once",
 )
 class Map(Block, Generic[ItemT, ResultT]):
     class Operation(Tool):
@@ -31,7 +33,16 @@ class Map(Block, Generic[ItemT, ResultT]):
 
     run: Operation
 
+    # Items sent to the tool at once, 0 for no limit
+    max_concurrency: Annotated[int, Config()] = 0
+    # Send results through the result channel in item order
+    ordered: Annotated[bool, Config()] = True
+    # Keep every result to send as a list at the end. Without it the results are
+    # only sent through the result channel and are not kept in state
+    collect_results: Annotated[bool, Config()] = True
+
     results: Output[list[ResultT]]
+    result: OutputChannel[ResultT]
 
     count: Annotated[
         int,
@@ -49,16 +60,64 @@ class Map(Block, Generic[ItemT, ResultT]):
         ),
     ] = []
 
+    # The items, kept only when max_concurrency leaves some to be sent as
+    # results arrive. Cleared once the last one is sent
+    items_state: Annotated[
+        list[Any],
+        State(
+            step_id="map",
+            input_ids=["items"],
+        ),
+    ] = []
+
+    # Index of the next item to send to the tool
+    next_index: Annotated[
+        int,
+        State(
+            step_id="map",
+            input_ids=["items"],
+        ),
+    ] = 0
+
+    # Index of the next result to send through the result channel, and the
+    # results that arrived before it
+    next_result: Annotated[
+        int,
+        State(
+            step_id="map",
+            input_ids=["items"],
+        ),
+    ] = 0
+    early_results: Annotated[
+        dict[int, Any],
+        State(
+            step_id="map",
+            input_ids=["items"],
+        ),
+    ] = {}
+
     @step()
     async def map(self, items: list[ItemT]):
         if len(items) == 0:
-            self.results.send([])
+            if self.collect_results:
+                self.results.send([])
+            self.result.close()
             return
 
-        self.results_state = [None] * len(items)
+        self.results_state = [None] * len(items) if self.collect_results else []
         self.count = len(items)
-        for i, item in enumerate(items):
-            await self.run.call(item).then(lambda result: self.collect(result, i))
+        self.next_result = 0
+        self.early_results = {}
+
+        slots = (
+            min(self.max_concurrency, len(items))
+            if self.max_concurrency > 0
+            else len(items)
+        )
+        self.items_state = list(items) if slots < len(items) else []
+        self.next_index = slots
+        for i in range(slots):
+            await self._send(items[i], i)
 
     @callback()
     async def collect(
@@ -66,19 +125,214 @@ class Map(Block, Generic[ItemT, ResultT]):
         result: ResultT,
         index: int,
     ):
-        self.results_state[index] = result
+        if self.collect_results:
+            self.results_state[index] = result
         self.count -= 1
 
+        if not self.ordered:
+            self.result.send(result)
+        else:
+            self.early_results[index] = result
+            while self.next_result in self.early_results:
+                self.result.send(self.early_results.pop(self.next_result))
+                self.next_result += 1
+
+        await self._send_next()
+
         if self.count == 0:
-            self.results.send(self.results_state)
+            if self.collect_results:
+                self.results.send(self.results_state)
+            self.result.close()
+
+    async def _send_next(self):
+        i = self.next_index
+        if i >= len(self.items_state):
+            return
+
+        item = self.items_state[i]
+        self.next_index += 1
+        if self.next_index == len(self.items_state):
+            self.items_state = []
+        await self._send(item, i)
+
+    async def _send(self, item: Any, index: int):
+        await self.run.call(item).then(lambda result: self.collect(result, index))
 
 
 @metadata(
     category=BlockCategory.FUNCTION,
-    description="Collects data from a channel and outputs them as a list once the channel closes",
+    description="Splits the items input into batches of batch_size and sends each batch to the configured tool, which returns a list with a result for each item. Once all batches have been processed, outputs the resulting list. Each result is also sent through the result channel as it arrives, in item order unless ordered is off. max_concurrency limits how many batches are with the tool at once",
+)
+class BatchMap(Block, Generic[ItemT, ResultT]):
+    class BatchOperation(Tool):
+        def run(self, items: list[ItemT]) -> list[ResultT]: ...
+
+    run: BatchOperation
+
+    batch_size: Annotated[int, Config()] = 10
+    # Batches sent to the tool at once, 0 for no limit
+    max_concurrency: Annotated[int, Config()] = 0
+    # Send results through the result channel in item order
+    ordered: Annotated[bool, Config()] = True
+    # Keep every result to send as a list at the end. Without it the results are
+    # only sent through the result channel and are not kept in state
+    collect_results: Annotated[bool, Config()] = True
+
+    results: Output[list[ResultT]]
+    result: OutputChannel[ResultT]
+
+    # Batches still to be returned by the tool
+    count: Annotated[
+        int,
+        State(
+            step_id="map",
+            input_ids=["items"],
+        ),
+    ] = 0
+
+    results_state: Annotated[
+        list[Any],
+        State(
+            step_id="map",
+            input_ids=["items"],
+        ),
+    ] = []
+
+    item_count: Annotated[
+        int,
+        State(
+            step_id="map",
+            input_ids=["items"],
+        ),
+    ] = 0
+
+    # The items, kept only when max_concurrency leaves batches to be sent as
+    # results arrive. Cleared once the last batch is sent
+    items_state: Annotated[
+        list[Any],
+        State(
+            step_id="map",
+            input_ids=["items"],
+        ),
+    ] = []
+
+    # Index of the next batch to send to the tool
+    next_index: Annotated[
+        int,
+        State(
+            step_id="map",
+            input_ids=["items"],
+        ),
+    ] = 0
+
+    # Index of the next batch of results to send through the result channel,
+    # and the batches of results that arrived before it
+    next_result: Annotated[
+        int,
+        State(
+            step_id="map",
+            input_ids=["items"],
+        ),
+    ] = 0
+    early_results: Annotated[
+        dict[int, list[Any]],
+        State(
+            step_id="map",
+            input_ids=["items"],
+        ),
+    ] = {}
+
+    @step()
+    async def map(self, items: list[ItemT]):
+        if len(items) == 0:
+            if self.collect_results:
+                self.results.send([])
+            self.result.close()
+            return
+
+        batches = [list(batch) for batch in chunked(items, max(self.batch_size, 1))]
+        self.results_state = [None] * len(items) if self.collect_results else []
+        self.count = len(batches)
+        self.item_count = len(items)
+        self.next_result = 0
+        self.early_results = {}
+
+        slots = (
+            min(self.max_concurrency, len(batches))
+            if self.max_concurrency > 0
+            else len(batches)
+        )
+        self.items_state = list(items) if slots < len(batches) else []
+        self.next_index = slots
+        for i in range(slots):
+            await self._send(batches[i], i)
+
+    @callback()
+    async def collect(
+        self,
+        results: list[ResultT],
+        index: int,
+    ):
+        size = max(self.batch_size, 1)
+        start = index * size
+        batch_length = min(size, self.item_count - start)
+        if not isinstance(results, list) or len(results) != batch_length:
+            returned = len(results) if isinstance(results, list) else type(results)
+            raise ValueError(
+                f"The tool returned {returned} results for batch {index} of {batch_length} items, it must return a list with one result for each item"
+            )
+
+        if self.collect_results:
+            self.results_state[start : start + batch_length] = results
+        self.count -= 1
+
+        if not self.ordered:
+            for result in results:
+                self.result.send(result)
+        else:
+            self.early_results[index] = results
+            while self.next_result in self.early_results:
+                for result in self.early_results.pop(self.next_result):
+                    self.result.send(result)
+                self.next_result += 1
+
+        await self._send_next()
+
+        if self.count == 0:
+            if self.collect_results:
+                self.results.send(self.results_state)
+            self.result.close()
+
+    async def _send_next(self):
+        i = self.next_index
+        size = max(self.batch_size, 1)
+        start = i * size
+        if start >= len(self.items_state):
+            return
+
+        batch = self.items_state[start : start + size]
+        self.next_index += 1
+        if start + size >= len(self.items_state):
+            self.items_state = []
+        await self._send(batch, i)
+
+    async def _send(self, batch: list[Any], index: int):
+        await self.run.call(batch).then(lambda results: self.collect(results, index))
+
+
+@metadata(
+    category=BlockCategory.FUNCTION,
+    description="Collects data from a channel and outputs them as a list once the channel closes. When window_size or window_ms is set, the items are instead sent through the batch channel every window_size items, or on the first item after window_ms has passed, and the rest when the channel closes",
 )
 class Collect(Block, Generic[ItemT]):
+    # Items in each batch, 0 to not batch by count
+    window_size: Annotated[int, Config()] = 0
+    # Milliseconds after the first item of a batch before it is sent, 0 to not
+    # batch by time. Checked as items arrive
+    window_ms: Annotated[int, Config()] = 0
+
     items: Output[list[ItemT]]
+    batch: OutputChannel[list[ItemT]]
 
     items_state: Annotated[
         list[ItemT],
@@ -88,20 +342,55 @@ class Collect(Block, Generic[ItemT]):
         ),
     ] = []
 
+    # When the first item of the current batch arrived, as a unix time in seconds.
+    # Wall clock time so it can be compared between runs on different workers
+    window_start: Annotated[
+        float,
+        State(
+            step_id="collect",
+            input_ids=["item"],
+        ),
+    ] = 0
+
     @step()
     async def collect(
         self,
         item: InputChannel[ItemT],
     ):
+        # Never append to the class level default
+        if self.items_state is Collect.items_state:
+            self.items_state = []
+
+        windowed = self.window_size > 0 or self.window_ms > 0
+
         if (
             item.state == ChannelState.OPEN
             and item.event == ChannelEvent.DATA
             and item.data
         ):
+            if not self.items_state:
+                self.window_start = time.time()
             self.items_state.append(item.data)
 
+            if windowed and self._window_full():
+                self.batch.send(self.items_state)
+                self.items_state = []
+
         if item.event == ChannelEvent.CLOSE:
-            self.items.send(self.items_state)
+            if not windowed:
+                self.items.send(self.items_state)
+            else:
+                if self.items_state:
+                    self.batch.send(self.items_state)
+                    self.items_state = []
+                self.batch.close()
+
+    def _window_full(self) -> bool:
+        if self.window_size > 0 and len(self.items_state) >= self.window_size:
+            return True
+
+        elapsed_ms = (time.time() - self.window_start) * 1000
+        return self.window_ms > 0 and elapsed_ms >= self.window_ms
 
 
 class Count(Block):
@@ -181,9 +470,20 @@ class First(Block, Generic[firstItemT]):
 
 @metadata(
     category=BlockCategory.FUNCTION,
-    description="Flattens a list of lists into a single list",
+    description="Flattens a list of lists into a single list. A list of columnar tables is combined into one table",
 )
 class Flatten(Block):
     @step(output_name="list")
-    async def flatten(self, lists: list[list[Any]]) -> list[Any]:
-        return list(flatten(lists))
+    async def flatten(
+        self, lists: list[list[Any] | dict[str, Any]]
+    ) -> list[Any] | dict[str, Any]:
+        tables = [is_columnar(item) for item in lists]
+        if lists and all(tables):
+            return concat_columnar(lists)
+
+        return list(
+            flatten(
+                iter_rows(item) if is_table else item
+                for item, is_table in zip(lists, tables)
+            )
+        )
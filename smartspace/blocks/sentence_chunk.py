@@ -1,14 +1,14 @@
+import asyncio
 from typing import Annotated
 
-import tiktoken
 from llama_index.core import Document
 from llama_index.core.node_parser import (
     SentenceSplitter,
 )
-from tiktoken.model import MODEL_TO_ENCODING
-from transformers import AutoTokenizer
 
-from smartspace.core import Block, Config, metadata, step
+from smartspace.blocks.spans import ChunkSpan, locate_chunks
+from smartspace.blocks.token_chunk import get_tokenizer
+from smartspace.core import Block, Config, OutputChannel, metadata, step
 from smartspace.enums import BlockCategory
 
 
@@ -27,6 +27,7 @@ from smartspace.enums import BlockCategory
         separator: Default separator for splitting into words. (default is " ")
         paragraph_separator: Separator between paragraphs. (default is "\\n\\n\\n")
         secondary_chunking_regex: Backup regex for splitting into sentences.(default is "[^,\\.;]+[,\\.;]?".)
+        output_spans: Output the position of each chunk (document index, start, end, token count) instead of a copy of its text. A chunk that is not an exact substring of the text, such as one where the secondary regex collapsed punctuation, is None. (default is False)
         
     Steps: 
         1: Break text into splits that are smaller than chunk size base on the separators and regex.
@@ -43,21 +44,14 @@ class SentenceChunk(Block):
     model_name: Annotated[str, Config()] = "gpt-3.5-turbo"
 
     secondary_chunking_regex: Annotated[str, Config()] = "[^,.;。？！]+[,.;。？！]?"
+    output_spans: Annotated[bool, Config()] = False
 
     @step(output_name="result")
-    async def sentence_chunk(self, text: str | list[str]) -> list[str]:
+    async def sentence_chunk(
+        self, text: str | list[str]
+    ) -> list[str] | list[ChunkSpan | None]:
         # get the tokenizer for the model
-        tiktoken_models = MODEL_TO_ENCODING.keys()
-
-        if self.model_name in tiktoken_models:
-            tokenizer = tiktoken.encoding_for_model(model_name=self.model_name).encode
-        else:
-            try:
-                tokenizer = AutoTokenizer.from_pretrained(self.model_name).encode
-            except Exception as e:
-                raise RuntimeError(
-                    f"Error loading tokenizer for model {self.model_name}: {str(e)}"
-                )
+        tokenizer = get_tokenizer(self.model_name)
 
         if isinstance(text, str):
             doc_text_list = [text]
@@ -75,6 +69,18 @@ class SentenceChunk(Block):
             tokenizer=tokenizer,
         )
         try:
+            if self.output_spans:
+                return [
+                    span
+                    for i, doc_text in enumerate(doc_text_list)
+                    for span in locate_chunks(
+                        i,
+                        doc_text,
+                        splitter.split_text_metadata_aware(doc_text, ""),
+                        tokenizer,
+                    )
+                ]
+
             nodes = splitter.get_nodes_from_documents(documents)
             text_chunks = [node.text for node in nodes]
             if len(text_chunks) == 0:
@@ -84,3 +90,68 @@ class SentenceChunk(Block):
             return text_chunks
         except Exception as e:
             raise RuntimeError(f"Error during chunking: {str(e)}")
+
+
+@metadata(
+    category=BlockCategory.FUNCTION,
+    description="""
+    Streaming version of SentenceChunk.
+
+    Splits the text into chunks with a preference for complete sentences and sends
+    the chunks of each document through the chunk channel as soon as that document
+    has been split. The channel is closed once every document has been processed.
+
+    Args:
+        chunk_size: The number of tokens to include in each chunk. (default is 200)
+        chunk_overlap: The number of tokens that overlap between consecutive chunks. (default is 10)
+        separator: Default separator for splitting into words. (default is " ")
+        paragraph_separator: Separator between paragraphs. (default is "\\n\\n\\n")
+        secondary_chunking_regex: Backup regex for splitting into sentences.(default is "[^,\\.;]+[,\\.;]?".)
+    """,
+)
+class SentenceChunkStream(Block):
+    chunk_size: Annotated[int, Config()] = 200
+    chunk_overlap: Annotated[int, Config()] = 10
+
+    separator: Annotated[str, Config()] = " "
+    paragraph_separator: Annotated[str, Config()] = "\n\n\n"
+    model_name: Annotated[str, Config()] = "gpt-3.5-turbo"
+
+    secondary_chunking_regex: Annotated[str, Config()] = "[^,.;。？！]+[,.;。？！]?"
+
+    chunk: OutputChannel[str]
+
+    @step()
+    async def sentence_chunk(self, text: str | list[str]):
+        tokenizer = get_tokenizer(self.model_name)
+
+        if isinstance(text, str):
+            doc_text_list = [text]
+        else:
+            doc_text_list = text
+
+        splitter = SentenceSplitter(
+            chunk_size=self.chunk_size,
+            chunk_overlap=self.chunk_overlap,
+            separator=self.separator,
+            paragraph_separator=self.paragraph_separator,
+            secondary_chunking_regex=self.secondary_chunking_regex,
+            tokenizer=tokenizer,
+        )
+
+        try:
+            sent = False
+            for doc_text in doc_text_list:
+                chunks = await asyncio.to_thread(
+                    splitter.split_text_metadata_aware, doc_text, ""
+                )
+                for chunk in chunks:
+                    self.chunk.send(chunk)
+                    sent = True
+        except Exception as e:
+            raise RuntimeError(f"Error during chunking: {str(e)}")
+
+        if not sent:
+            # Like SentenceChunk, there is no text to chunk so the result is empty
+            self.chunk.send("")
+        self.chunk.close()
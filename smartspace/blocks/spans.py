@@ -0,0 +1,88 @@
+from typing import Any, Callable, Iterable
+
+from pydantic import BaseModel, ValidationError
+
+
+class ChunkSpan(BaseModel):
+    """
+    A chunk described by its position in the original text instead of a copy of it.
+    document is the index of the source text when a list of texts was chunked.
+    """
+
+    document: int
+    start: int
+    end: int
+    token_count: int | None = None
+
+
+def locate_chunks(
+    document: int,
+    text: str,
+    chunks: Iterable[str],
+    tokenizer: Callable[[str], list] | None = None,
+) -> list[ChunkSpan | None]:
+    """
+    Finds the position of each chunk in the text it was split from.
+    Chunks must be in document order, they may overlap. Each chunk is matched to
+    its first occurrence that ends after the previous chunk, so repeated text is
+    not matched to an earlier copy. A chunk that is not an exact substring of the
+    text, for example because the splitter collapsed some punctuation, has no
+    position and is None.
+    """
+    spans: list[ChunkSpan | None] = []
+    previous_start = -1
+    previous_end = 0
+
+    for chunk in chunks:
+        start = text.find(
+            chunk, max(previous_start + 1, previous_end - len(chunk) + 1, 0)
+        )
+        if start == -1:
+            start = text.find(chunk, previous_start + 1)
+        if start == -1:
+            spans.append(None)
+            continue
+
+        spans.append(
+            ChunkSpan(
+                document=document,
+                start=start,
+                end=start + len(chunk),
+                token_count=len(tokenizer(chunk)) if tokenizer else None,
+            )
+        )
+        previous_start = start
+        previous_end = start + len(chunk)
+
+    return spans
+
+
+def span_text(source: str | list[str], span: ChunkSpan | dict[str, Any]) -> str:
+    """Slices the text of a span out of the text(s) it was created from."""
+    if isinstance(span, dict):
+        span = ChunkSpan.model_validate(span)
+
+    texts = [source] if isinstance(source, str) else source
+    return texts[span.document][span.start : span.end]
+
+
+def _as_span(value: Any) -> ChunkSpan | None:
+    if isinstance(value, ChunkSpan):
+        return value
+
+    if isinstance(value, dict) and {"document", "start", "end"} <= value.keys():
+        try:
+            return ChunkSpan.model_validate(value)
+        except ValidationError:
+            return None
+
+    return None
+
+
+def resolve_spans(value: Any, source: str | list[str]) -> Any:
+    """Replaces any spans in value, or in a list of values, with their text."""
+    if isinstance(value, list):
+        return [resolve_spans(item, source) for item in value]
+
+    span = _as_span(value)
+    return value if span is None else span_text(source, span)
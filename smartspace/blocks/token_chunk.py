@@ -1,17 +1,138 @@
-from typing import Annotated
+import asyncio
+from functools import lru_cache, partial
+from typing import Annotated, Callable, Iterator
 
 import tiktoken
 from llama_index.core import Document
 from llama_index.core.node_parser import (
     TokenTextSplitter,
 )
-from tiktoken.model import MODEL_TO_ENCODING
-from transformers import AutoTokenizer
+from llama_index.core.node_parser.text.token import DEFAULT_METADATA_FORMAT_LEN
+from llama_index.core.node_parser.text.utils import split_by_char, split_by_sep
+from transformers import AutoTokenizer, PreTrainedTokenizerBase
 
-from smartspace.core import Block, Config, metadata, step
+from smartspace.blocks.spans import ChunkSpan, locate_chunks
+from smartspace.core import (
+    Block,
+    ChannelEvent,
+    Config,
+    InputChannel,
+    OutputChannel,
+    State,
+    metadata,
+    step,
+)
 from smartspace.enums import BlockCategory
 
 
+@lru_cache(maxsize=None)
+def _load_tokenizer(model_name: str) -> tiktoken.Encoding | PreTrainedTokenizerBase:
+    """
+    Loads the given model's tokenizer.
+    Tokenizers are cached, so each one is only loaded once.
+    """
+    try:
+        # Also maps versions of OpenAI models, such as gpt-4-0613 or gpt-4o-mini
+        return tiktoken.encoding_for_model(model_name=model_name)
+    except KeyError:
+        pass
+
+    try:
+        return AutoTokenizer.from_pretrained(model_name)
+    except Exception as e:
+        if "/" in model_name:
+            raise RuntimeError(
+                f"Error loading tokenizer for model {model_name}: {str(e)}"
+            )
+
+    # Like litellm, fall back to cl100k_base for other models, such as claude-*
+    return tiktoken.get_encoding("cl100k_base")
+
+
+def get_tokenizer(model_name: str) -> Callable[[str], list]:
+    """Returns the encode function for the given model's tokenizer."""
+    return _load_tokenizer(model_name).encode
+
+
+def get_batch_tokenizer(model_name: str) -> Callable[[list[str]], list[list]]:
+    """
+    Returns a function that encodes a list of texts in one call to the given
+    model's tokenizer, with the same tokens as get_tokenizer.
+    """
+    tokenizer = _load_tokenizer(model_name)
+    if isinstance(tokenizer, tiktoken.Encoding):
+        return tokenizer.encode_batch
+
+    return lambda texts: tokenizer(texts)["input_ids"]
+
+
+def get_detokenizer(model_name: str) -> Callable[[list[int]], str]:
+    """Returns the decode function for the given model's tokenizer."""
+    tokenizer = _load_tokenizer(model_name)
+    if isinstance(tokenizer, tiktoken.Encoding):
+        return tokenizer.decode
+
+    return partial(tokenizer.decode, skip_special_tokens=True)
+
+
+def _iter_splits(
+    text: str,
+    chunk_size: int,
+    split_fns: list[Callable[[str], list[str]]],
+    tokenizer: Callable[[str], list],
+) -> Iterator[str]:
+    """
+    Lazy version of TokenTextSplitter._split, yields splits of text that fit in
+    chunk_size, trying each split function in turn.
+    """
+    if len(tokenizer(text)) <= chunk_size:
+        yield text
+        return
+
+    for split_fn in split_fns:
+        splits = split_fn(text)
+        if len(splits) > 1:
+            break
+
+    for split in splits:
+        yield from _iter_splits(split, chunk_size, split_fns, tokenizer)
+
+
+def _iter_chunks(
+    splits: Iterator[str],
+    chunk_size: int,
+    chunk_overlap: int,
+    tokenizer: Callable[[str], list],
+) -> Iterator[str]:
+    """
+    Lazy version of TokenTextSplitter._merge, yields each chunk as soon as the
+    next split shows it is complete.
+    """
+    cur_chunk: list[str] = []
+    cur_tokens: list[int] = []
+    for split in splits:
+        split_len = len(tokenizer(split))
+        cur_len = sum(cur_tokens)
+        if cur_len + split_len > chunk_size:
+            chunk = "".join(cur_chunk).strip()
+            if chunk:
+                yield chunk
+
+            # Keep the end of the finished chunk as the overlap of the next one
+            while cur_chunk and (
+                cur_len > chunk_overlap or cur_len + split_len > chunk_size
+            ):
+                cur_chunk.pop(0)
+                cur_len -= cur_tokens.pop(0)
+
+        cur_chunk.append(split)
+        cur_tokens.append(split_len)
+
+    chunk = "".join(cur_chunk).strip()
+    if chunk:
+        yield chunk
+
+
 @metadata(
     category=BlockCategory.FUNCTION,
     description="""
@@ -22,6 +143,9 @@ from smartspace.enums import BlockCategory
     - chunk_overlap: The number of tokens that overlap between consecutive
                         chunks. (default is 10)
     - separator: Default separator for splitting into words. (default is " ")
+    - output_spans: Output the position of each chunk (document index, start, end,
+                        token count) instead of a copy of its text. A chunk that is
+                        not an exact substring of the text is None. (default is False)
 
     This chunking method is particularly useful when:
     - You need precise control over the size of each chunk.
@@ -38,23 +162,17 @@ class TokenChunk(Block):
     chunk_overlap: Annotated[int, Config()] = 10
     separator: Annotated[str, Config()] = " "
     model_name: Annotated[str, Config()] = "gpt-3.5-turbo"
+    output_spans: Annotated[bool, Config()] = False
 
     # backup_separators: Annotated[List] # description="Additional separators for splitting."
 
     @step(output_name="result")
-    async def token_chunk(self, text: str | list[str]) -> list[str]:
+    async def token_chunk(
+        self, text: str | list[str]
+    ) -> list[str] | list[ChunkSpan | None]:
         # get the tokenizer for the model
-        tiktoken_models = MODEL_TO_ENCODING.keys()
+        tokenizer = get_tokenizer(self.model_name)
 
-        if self.model_name in tiktoken_models:
-            tokenizer = tiktoken.encoding_for_model(model_name=self.model_name).encode
-        else:
-            try:
-                tokenizer = AutoTokenizer.from_pretrained(self.model_name).encode
-            except Exception as e:
-                raise RuntimeError(
-                    f"Error loading tokenizer for model {self.model_name}: {str(e)}"
-                )
         # for single document, convert to list
         if isinstance(text, str):
             doc_text_list = [text]
@@ -64,10 +182,23 @@ class TokenChunk(Block):
         splitter = TokenTextSplitter(
             chunk_size=self.chunk_size,
             chunk_overlap=self.chunk_overlap,
+            separator=self.separator,
             tokenizer=tokenizer,
         )
 
         try:
+            if self.output_spans:
+                return [
+                    span
+                    for i, doc_text in enumerate(doc_text_list)
+                    for span in locate_chunks(
+                        i,
+                        doc_text,
+                        splitter.split_text_metadata_aware(doc_text, ""),
+                        tokenizer,
+                    )
+                ]
+
             nodes = splitter.get_nodes_from_documents(documents)
             text_chunks = [node.text for node in nodes]
             if len(text_chunks) == 0:
@@ -77,3 +208,215 @@ class TokenChunk(Block):
             return text_chunks
         except Exception as e:
             raise RuntimeError(f"Error during chunking: {str(e)}")
+
+
+@metadata(
+    category=BlockCategory.FUNCTION,
+    description="""
+    Streaming version of TokenChunk.
+
+    Splits the text into chunks with a fixed token size and sends each chunk
+    through the chunk channel as soon as it is complete, even within a single
+    document, so downstream blocks can start working before the whole input has
+    been chunked. The channel is closed once every document has been processed.
+
+    Args:
+    - chunk_size: The number of tokens to include in each chunk. (default is 200)
+    - chunk_overlap: The number of tokens that overlap between consecutive
+                        chunks. (default is 10)
+    - separator: Default separator for splitting into words. (default is " ")
+    """,
+)
+class TokenChunkStream(Block):
+    chunk_size: Annotated[int, Config()] = 200
+    chunk_overlap: Annotated[int, Config()] = 10
+    separator: Annotated[str, Config()] = " "
+    model_name: Annotated[str, Config()] = "gpt-3.5-turbo"
+
+    chunk: OutputChannel[str]
+
+    @step()
+    async def token_chunk(self, text: str | list[str]):
+        tokenizer = get_tokenizer(self.model_name)
+
+        if isinstance(text, str):
+            doc_text_list = [text]
+        else:
+            doc_text_list = text
+
+        if self.chunk_overlap > self.chunk_size:
+            raise ValueError(
+                f"Got a larger chunk overlap ({self.chunk_overlap}) than chunk size "
+                f"({self.chunk_size}), should be smaller."
+            )
+
+        # Split the same way as the TokenTextSplitter of TokenChunk, which keeps
+        # room for the metadata of its documents even though they have none
+        chunk_size = self.chunk_size - len(tokenizer("")) - DEFAULT_METADATA_FORMAT_LEN
+        if chunk_size <= 0:
+            raise ValueError(
+                f"Chunk size ({self.chunk_size}) is too small, it must be larger than "
+                f"{self.chunk_size - chunk_size} tokens."
+            )
+        split_fns = [split_by_sep(self.separator), split_by_sep("\n"), split_by_char()]
+
+        try:
+            sent = False
+            for doc_text in doc_text_list:
+                if doc_text == "":
+                    self.chunk.send("")
+                    sent = True
+                    continue
+
+                chunks = _iter_chunks(
+                    _iter_splits(doc_text, chunk_size, split_fns, tokenizer),
+                    chunk_size,
+                    self.chunk_overlap,
+                    tokenizer,
+                )
+                # Work out each chunk in a worker thread and send it as soon as it
+                # is complete, so long documents are forwarded chunk by chunk
+                while (
+                    chunk := await asyncio.to_thread(next, chunks, None)
+                ) is not None:
+                    self.chunk.send(chunk)
+                    sent = True
+        except Exception as e:
+            raise RuntimeError(f"Error during chunking: {str(e)}")
+
+        if not sent:
+            # Like TokenChunk, there is no text to chunk so the result is empty
+            self.chunk.send("")
+        self.chunk.close()
+
+
+@metadata(
+    category=BlockCategory.FUNCTION,
+    description="""
+    Incremental version of TokenChunk for text that arrives over a channel.
+
+    Text is split into words as it arrives and merged into chunks the same way as
+    TokenChunk. Each chunk is sent through the chunk channel as soon as the next
+    word shows it is complete, so there is no need to Collect the text first.
+    Only the current chunk and the unfinished trailing word are kept in state.
+    The remaining text is flushed and the chunk channel closed when the text
+    channel closes.
+
+    Args:
+    - chunk_size: The number of tokens to include in each chunk. (default is 200)
+    - chunk_overlap: The number of tokens that overlap between consecutive
+                        chunks. (default is 10)
+    - separator: Default separator for splitting into words. (default is " ")
+    """,
+)
+class IncrementalTokenChunk(Block):
+    chunk_size: Annotated[int, Config()] = 200
+    chunk_overlap: Annotated[int, Config()] = 10
+    separator: Annotated[str, Config()] = " "
+    model_name: Annotated[str, Config()] = "gpt-3.5-turbo"
+
+    chunk: OutputChannel[str]
+
+    splits: Annotated[
+        list[str],
+        State(
+            step_id="token_chunk",
+            input_ids=["text"],
+        ),
+    ] = []
+    split_tokens: Annotated[
+        list[int],
+        State(
+            step_id="token_chunk",
+            input_ids=["text"],
+        ),
+    ] = []
+    tail: Annotated[
+        str,
+        State(
+            step_id="token_chunk",
+            input_ids=["text"],
+        ),
+    ] = ""
+
+    @step()
+    async def token_chunk(self, text: InputChannel[str]):
+        if self.chunk_overlap > self.chunk_size:
+            raise ValueError(
+                f"Got a larger chunk overlap ({self.chunk_overlap}) than chunk size "
+                f"({self.chunk_size}), should be smaller."
+            )
+
+        tokenizer = get_tokenizer(self.model_name)
+
+        # Work on copies so the class level state defaults are never mutated
+        self.splits = list(self.splits)
+        self.split_tokens = list(self.split_tokens)
+
+        if text.event == ChannelEvent.DATA and text.data:
+            # The text after the last separator may continue in the next message
+            *complete, tail = (self.tail + text.data).split(self.separator)
+            if complete:
+                self._add_split(complete[0], tokenizer)
+                for split in complete[1:]:
+                    self._add_split(self.separator + split, tokenizer)
+                tail = self.separator + tail
+            self.tail = tail
+
+            # A tail without separators could otherwise grow without bound
+            if len(tokenizer(self.tail)) > self.chunk_size:
+                *complete, self.tail = self._split_oversized(self.tail, tokenizer)
+                for split in complete:
+                    self._add_split(split, tokenizer)
+
+        if text.event == ChannelEvent.CLOSE:
+            if self.tail:
+                self._add_split(self.tail, tokenizer)
+
+            chunk = "".join(self.splits).strip()
+            if chunk:
+                self.chunk.send(chunk)
+
+            self.splits = []
+            self.split_tokens = []
+            self.tail = ""
+            self.chunk.close()
+
+    def _split_oversized(
+        self, split: str, tokenizer: Callable[[str], list]
+    ) -> list[str]:
+        if len(tokenizer(split)) <= self.chunk_size:
+            return [split]
+
+        for split_fn in (split_by_sep("\n"), split_by_char()):
+            parts = split_fn(split)
+            if len(parts) > 1:
+                break
+
+        return [part for p in parts for part in self._split_oversized(p, tokenizer)]
+
+    def _add_split(self, split: str, tokenizer: Callable[[str], list]):
+        if not split:
+            return
+
+        split_len = len(tokenizer(split))
+        if split_len > self.chunk_size:
+            for part in self._split_oversized(split, tokenizer):
+                self._add_split(part, tokenizer)
+            return
+
+        cur_len = sum(self.split_tokens)
+        if cur_len + split_len > self.chunk_size:
+            chunk = "".join(self.splits).strip()
+            if chunk:
+                self.chunk.send(chunk)
+
+            # Keep the end of the finished chunk as the overlap of the next one
+            while self.splits and (
+                cur_len > self.chunk_overlap or cur_len + split_len > self.chunk_size
+            ):
+                self.splits.pop(0)
+                cur_len -= self.split_tokens.pop(0)
+
+        self.splits.append(split)
+        self.split_tokens.append(split_len)
@@ -1,10 +1,40 @@
+from enum import Enum
 from typing import Annotated
 
-from litellm.utils import decode, encode
-
-from smartspace.core import Block, Config, metadata, step
+from smartspace.blocks.spans import ChunkSpan, span_text
+from smartspace.blocks.token_chunk import (
+    get_batch_tokenizer,
+    get_detokenizer,
+    get_tokenizer,
+)
+from smartspace.core import Block, Config, Metadata, metadata, step
 from smartspace.enums import BlockCategory
 
+# Generous upper bound on the characters in a token. Only a prefix of this many
+# characters per token is encoded, and it is doubled until enough tokens are found
+CHARS_PER_TOKEN = 8
+
+
+def encode(model: str, text: str) -> list[int]:
+    """Encodes text with the same tokenizer as the chunk blocks"""
+    return get_tokenizer(model)(text)
+
+
+def encode_batch(model: str, texts: list[str]) -> list[list[int]]:
+    """Encodes each text like encode, in a single call to the tokenizer"""
+    return get_batch_tokenizer(model)(texts)
+
+
+def decode(model: str, tokens: list[int]) -> str:
+    """Decodes tokens created by encode"""
+    return get_detokenizer(model)(tokens)
+
+
+class TruncationStrategy(str, Enum):
+    HEAD = "head"  # keep the start of the string
+    TAIL = "tail"  # keep the end of the string
+    MIDDLE = "middle"  # keep the start and the end, drop the middle
+
 
 @metadata(
     category=BlockCategory.FUNCTION,
@@ -13,18 +43,122 @@ from smartspace.enums import BlockCategory
 class StringTruncator(Block):
     max_token: Annotated[int, Config()] = 100  # default token limit
     model_name: Annotated[str, Config()] = "gpt-3.5-turbo"  # default model
+    strategy: Annotated[TruncationStrategy, Config()] = TruncationStrategy.HEAD
 
     @step(output_name="result")
-    async def truncate_string(self, input_strings: str) -> str:
-        tokens = encode(model=self.model_name, text=input_strings)
+    async def truncate_string(
+        self,
+        input_strings: Annotated[
+            str | list[str] | ChunkSpan,
+            Metadata(
+                description="String to truncate, a list of strings to truncate in one batch, or a chunk span into text"
+            ),
+        ],
+        text: Annotated[
+            str | list[str] | None,
+            Metadata(
+                description="Original text that the span points into. Required when input_strings is a span"
+            ),
+        ] = None,
+    ) -> str | list[str]:
+        if isinstance(input_strings, list):
+            return self._truncate(input_strings)
+
+        if not isinstance(input_strings, str):
+            if text is None:
+                raise ValueError("text is required when truncating a chunk span")
+
+            input_strings = span_text(text, input_strings)
+
+        return self._truncate([input_strings])[0]
+
+    def _truncate(self, strings: list[str]) -> list[str]:
+        if self.strategy == TruncationStrategy.TAIL:
+            scans = self._scan(strings, self.max_token, from_end=True)
+        else:
+            scans = self._scan(strings, self.max_token, from_end=False)
+
+        results = [
+            string if complete and len(tokens) <= self.max_token else None
+            for string, (tokens, complete) in zip(strings, scans)
+        ]
+        truncate = [i for i, result in enumerate(results) if result is None]
+
+        if self.strategy == TruncationStrategy.HEAD:
+            for i in truncate:
+                results[i] = self._decode(scans[i][0][: self.max_token])
+
+        elif self.strategy == TruncationStrategy.TAIL:
+            for i in truncate:
+                results[i] = self._decode(scans[i][0][-self.max_token :])
+
+        elif self.strategy == TruncationStrategy.MIDDLE:
+            head_tokens = (self.max_token + 1) // 2
+            tail_tokens = self.max_token - head_tokens
+            tails = (
+                self._scan([strings[i] for i in truncate], tail_tokens, from_end=True)
+                if tail_tokens
+                else [([], True)] * len(truncate)
+            )
+
+            for i, (tokens, _) in zip(truncate, tails):
+                head = self._decode(scans[i][0][:head_tokens])
+                tail = self._decode(tokens[-tail_tokens:]) if tail_tokens else ""
+                results[i] = head + tail
+
+        else:
+            raise ValueError(f"Invalid strategy '{self.strategy}'")
+
+        return [result or "" for result in results]
+
+    def _scan(
+        self,
+        strings: list[str],
+        max_token: int,
+        from_end: bool,
+    ) -> list[tuple[list[int], bool]]:
+        """
+        Encodes the shortest prefix (or suffix) of each string that has more than
+        max_token tokens. Returns the tokens and whether the whole string was encoded.
+        """
+        scans: list[tuple[list[int], bool]] = [([], True)] * len(strings)
+        sizes = [max(max_token, 1) * CHARS_PER_TOKEN] * len(strings)
+        pending = list(range(len(strings)))
+
+        while pending:
+            pieces = [self._piece(strings[i], sizes[i], from_end) for i in pending]
+            encoded = self._encode(pieces)
+
+            still_pending: list[int] = []
+            for i, piece, tokens in zip(pending, pieces, encoded):
+                complete = len(piece) == len(strings[i])
+                scans[i] = (tokens, complete)
+
+                if not complete and len(tokens) <= max_token:
+                    sizes[i] *= 2
+                    still_pending.append(i)
+
+            pending = still_pending
+
+        return scans
+
+    def _piece(self, string: str, size: int, from_end: bool) -> str:
+        if size >= len(string):
+            return string
 
-        if len(tokens) <= self.max_token:
-            return input_strings
+        # Cut on a space so the token at the cut is not split into different tokens
+        if from_end:
+            start = string.find(" ", len(string) - size)
+            return string[start if start != -1 else len(string) - size :]
+        else:
+            end = string.rfind(" ", 0, size)
+            return string[: end if end > 0 else size]
 
-        # Truncate the tokens
-        truncated_tokens = tokens[: self.max_token]
+    def _encode(self, strings: list[str]) -> list[list[int]]:
+        if len(strings) == 1:
+            return [encode(model=self.model_name, text=strings[0])]
 
-        # Decode the truncated tokens back to a string
-        truncated_string = decode(model=self.model_name, tokens=truncated_tokens)
+        return encode_batch(model=self.model_name, texts=strings)
 
-        return truncated_string
+    def _decode(self, tokens: list[int]) -> str:
+        return decode(model=self.model_name, tokens=tokens)
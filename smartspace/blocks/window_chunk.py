@@ -1,14 +1,50 @@
-from typing import Annotated
+import asyncio
+from typing import Annotated, Iterator
 
 from llama_index.core import Document
 from llama_index.core.node_parser import (
     SentenceWindowNodeParser,
 )
+from llama_index.core.node_parser.text.utils import split_by_sentence_tokenizer
 
-from smartspace.core import Block, Config, metadata, step
+from smartspace.blocks.spans import ChunkSpan, locate_chunks
+from smartspace.core import Block, Config, OutputChannel, metadata, step
 from smartspace.enums import BlockCategory
 
 
+def iter_windows(sentences: list[str], window_size: int) -> Iterator[str]:
+    """Yields the window around each sentence, built the same way as SentenceWindowNodeParser."""
+    for i in range(len(sentences)):
+        yield " ".join(sentences[max(0, i - window_size) : i + window_size + 1])
+
+
+def window_spans(document: int, text: str, window_size: int) -> list[ChunkSpan | None]:
+    """
+    Returns the span of the window around each sentence. A window span covers the
+    original text from its first to its last sentence, so no window text is built.
+    The text of a span keeps the whitespace between sentences as it is in the
+    original text, where WindowChunk joins the sentences with a space.
+    """
+    sentence_spans = locate_chunks(document, text, split_by_sentence_tokenizer()(text))
+    last = len(sentence_spans) - 1
+
+    windows: list[ChunkSpan | None] = []
+    for i in range(len(sentence_spans)):
+        first_sentence = sentence_spans[max(0, i - window_size)]
+        last_sentence = sentence_spans[min(last, i + window_size)]
+        windows.append(
+            ChunkSpan(
+                document=document,
+                start=first_sentence.start,
+                end=last_sentence.end,
+            )
+            if first_sentence and last_sentence
+            else None
+        )
+
+    return windows
+
+
 @metadata(
     category=BlockCategory.FUNCTION,
     description="""
@@ -19,19 +55,33 @@ from smartspace.enums import BlockCategory
 
     Args:
         window_size: The number of sentences on each side of a sentence to capture.
+        output_spans: Output the position of each window (document index, start, end) instead of a copy of its text. The text of a window span is the original text from its first to its last sentence. (default is False)
     """,
 )
 class WindowChunk(Block):
     # Sentence Chunking
     window_size: Annotated[int, Config()] = 3
+    output_spans: Annotated[bool, Config()] = False
 
     @step(output_name="result")
-    async def window_chunk(self, text: str | list[str]) -> list[str]:
+    async def window_chunk(
+        self, text: str | list[str]
+    ) -> list[str] | list[ChunkSpan | None]:
         if isinstance(text, str):
             doc_text_list = [text]
         else:
             doc_text_list = text
 
+        if self.output_spans:
+            try:
+                return [
+                    span
+                    for i, doc_text in enumerate(doc_text_list)
+                    for span in window_spans(i, doc_text, self.window_size)
+                ]
+            except Exception as e:
+                raise RuntimeError(f"Error during chunking: {str(e)}")
+
         documents = [Document(text=doc_text) for doc_text in doc_text_list]
 
         splitter = SentenceWindowNodeParser.from_defaults(
@@ -50,3 +100,47 @@ class WindowChunk(Block):
             return text_chunks
         except Exception as e:
             raise RuntimeError(f"Error during chunking: {str(e)}")
+
+
+@metadata(
+    category=BlockCategory.FUNCTION,
+    description="""
+    Streaming version of WindowChunk.
+
+    Splits a document into sentences and sends the window around each sentence
+    through the chunk channel. Windows are built one at a time, so only the
+    sentences are held in memory rather than every window. The channel is closed
+    once every document has been processed.
+
+    Args:
+        window_size: The number of sentences on each side of a sentence to capture.
+    """,
+)
+class WindowChunkStream(Block):
+    window_size: Annotated[int, Config()] = 3
+
+    chunk: OutputChannel[str]
+
+    @step()
+    async def window_chunk(self, text: str | list[str]):
+        if isinstance(text, str):
+            doc_text_list = [text]
+        else:
+            doc_text_list = text
+
+        sentence_splitter = split_by_sentence_tokenizer()
+
+        try:
+            sent = False
+            for doc_text in doc_text_list:
+                sentences = await asyncio.to_thread(sentence_splitter, doc_text)
+                for window in iter_windows(sentences, self.window_size):
+                    self.chunk.send(window)
+                    sent = True
+        except Exception as e:
+            raise RuntimeError(f"Error during chunking: {str(e)}")
+
+        if not sent:
+            # Like WindowChunk, there is no sentence to chunk so the result is empty
+            self.chunk.send("")
+        self.chunk.close()
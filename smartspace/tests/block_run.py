@@ -0,0 +1,79 @@
+from typing import Any, Callable
+
+from smartspace.core import Block
+from smartspace.enums import ChannelEvent, ChannelState
+from smartspace.models import InputChannel
+
+
+def channel_data(data: Any) -> InputChannel:
+    return InputChannel(state=ChannelState.OPEN, event=ChannelEvent.DATA, data=data)
+
+
+def channel_close() -> InputChannel:
+    return InputChannel(state=ChannelState.CLOSED, event=ChannelEvent.CLOSE, data=None)
+
+
+class BlockRun:
+    """
+    Runs the steps and callbacks of a block one at a time like a flow does, with a
+    new block for each run and the state of the previous runs carried over.
+    """
+
+    def __init__(self, block_type: type[Block], **config: Any):
+        self.block_type = block_type
+        self.config = config
+        self.state: dict[str, Any] = {}
+        # (port, value) of everything the block has sent
+        self.outputs: list[tuple[str, Any]] = []
+        # (tool input, callback, callback inputs) of unanswered tool calls
+        self.tool_calls: list[tuple[Any, str, dict[str, Any]]] = []
+
+    async def step(self, name: str, *args: Any):
+        block = self._block()
+        await getattr(block, name)(*args)
+        self._read(block)
+
+    async def callback(self, name: str, *args: Any):
+        block = self._block()
+        call = await getattr(block, name)._call_inner(*args)
+        async for message in call:
+            block._messages.append(message)
+        self._read(block)
+
+    async def answer(self, position: int, fn: Callable[[Any], Any]):
+        """Answers a tool call with fn of its input, running the callback it names"""
+        tool_input, callback, inputs = self.tool_calls.pop(position)
+        await self.callback(callback, fn(tool_input), *inputs.values())
+
+    def sent(self, port: str) -> list[Any]:
+        return [value for p, value in self.outputs if p == port]
+
+    def channel(self, port: str) -> list[Any]:
+        """Data sent through an output channel"""
+        return [m.data for m in self.sent(port) if m.event == ChannelEvent.DATA]
+
+    def closed(self, port: str) -> bool:
+        return any(m.event == ChannelEvent.CLOSE for m in self.sent(port))
+
+    def _block(self) -> Any:
+        block = self.block_type()
+        for name, value in {**self.config, **self.state}.items():
+            setattr(block, name, value)
+        return block
+
+    def _read(self, block: Block):
+        for message in block.get_messages():
+            self.state.update({s.state: s.value for s in message.states})
+            if message.redirects:
+                # A tool call, its result is redirected to a callback
+                redirect = message.redirects[0]
+                tool_input = next(
+                    o.value.data
+                    for o in message.outputs
+                    if o.source.port == redirect.source.port
+                )
+                inputs = {i.target.pin: i.value for i in message.inputs}
+                self.tool_calls.append((tool_input, redirect.target.port, inputs))
+                continue
+
+            self.outputs.extend((o.source.port, o.value) for o in message.outputs)
@@ -0,0 +1,18 @@
+import pytest
+import pytest_asyncio
+
+from smartspace.tests.block_run import BlockRun
+from smartspace.tests.local_server import LocalServer
+
+
+@pytest_asyncio.fixture
+async def local_server():
+    server = LocalServer()
+    await server.start()
+    yield server
+    await server.stop()
+
+
+@pytest.fixture
+def block_run() -> type[BlockRun]:
+    return BlockRun
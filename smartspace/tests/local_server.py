@@ -0,0 +1,133 @@
+import asyncio
+import json
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+
+@dataclass
+class LocalRequest:
+    method: str
+    path: str
+    query: str
+    headers: dict[str, str]
+    body: bytes
+
+    def json(self) -> Any:
+        return json.loads(self.body)
+
+
+@dataclass
+class LocalResponse:
+    status: int = 200
+    headers: dict[str, str] = field(default_factory=dict)
+    body: bytes = b""
+    # When set the body is sent with chunked transfer encoding, one chunk at a time
+    chunks: AsyncIterator[bytes] | None = None
+
+    @classmethod
+    def json(cls, value: Any, status: int = 200, **headers: str) -> "LocalResponse":
+        return cls(
+            status=status,
+            headers={"Content-Type": "application/json", **headers},
+            body=json.dumps(value).encode(),
+        )
+
+
+Handler = Callable[[LocalRequest], Awaitable[LocalResponse]]
+
+
+class LocalServer:
+    """
+    A minimal HTTP/1.1 server with keep-alive, used as a stand-in for remote APIs in tests.
+    Routes map a path to an async handler. Unknown paths return 404.
+    """
+
+    def __init__(self):
+        self.routes: dict[str, Handler] = {}
+        self.requests: list[LocalRequest] = []
+        self.connections = 0
+        self._server: asyncio.Server | None = None
+        self._writers: set[asyncio.StreamWriter] = set()
+
+    @property
+    def url(self) -> str:
+        assert self._server
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    def route(self, path: str):
+        def decorator(handler: Handler) -> Handler:
+            self.routes[path] = handler
+            return handler
+
+        return decorator
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._serve, "127.0.0.1", 0)
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            for writer in self._writers:
+                writer.close()
+            await self._server.wait_closed()
+            await asyncio.sleep(0)
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        self._writers.add(writer)
+        try:
+            while request := await self._read_request(reader):
+                self.requests.append(request)
+                handler = self.routes.get(request.path)
+                response = (
+                    await handler(request) if handler else LocalResponse(status=404)
+                )
+                await self._write_response(writer, response)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> LocalRequest | None:
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+
+        method, target, _ = request_line.decode().split(" ", 2)
+        path, _, query = target.partition("?")
+
+        headers: dict[str, str] = {}
+        while (line := await reader.readline()) not in (b"\r\n", b""):
+            name, _, value = line.decode().partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        length = int(headers.get("content-length", 0))
+        body = await reader.readexactly(length) if length else b""
+
+        return LocalRequest(method, path, query, headers, body)
+
+    async def _write_response(
+        self, writer: asyncio.StreamWriter, response: LocalResponse
+    ):
+        headers = dict(response.headers)
+        if response.chunks is None:
+            headers["Content-Length"] = str(len(response.body))
+        else:
+            headers["Transfer-Encoding"] = "chunked"
+
+        head = f"HTTP/1.1 {response.status} Status\r\n" + "".join(
+            f"{name}: {value}\r\n" for name, value in headers.items()
+        )
+        writer.write(head.encode() + b"\r\n")
+
+        if response.chunks is None:
+            writer.write(response.body)
+        else:
+            async for chunk in response.chunks:
+                writer.write(f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n")
+                await writer.drain()
+            writer.write(b"0\r\n\r\n")
+
+        await writer.drain()
@@ -0,0 +1,95 @@
+import time
+
+import pytest
+
+from smartspace.blocks.buffer import Buffer, BufferOverflow
+
+
+@pytest.mark.asyncio
+async def test_buffer_releases_one_value_per_next(block_run):
+    run = block_run(Buffer)
+    for value in [1, 2, 3]:
+        await run.step("value", value)
+    await run.step("next", None)
+
+    assert run.outputs == [("output", 1), ("output", 2)]
+    assert run.state["values"] == [3]
+    assert Buffer.values == []
+
+
+@pytest.mark.asyncio
+async def test_buffer_releases_batches(block_run):
+    run = block_run(Buffer, batch_size=2)
+    await run.step("value", 1)
+    for value in [2, 3, 4]:
+        await run.step("value", value)
+    await run.step("next", None)
+    await run.step("next", None)
+
+    assert run.outputs == [("batch", [1]), ("batch", [2, 3]), ("batch", [4])]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "overflow,values",
+    [
+        (BufferOverflow.DROP_OLDEST, [4, 5]),
+        (BufferOverflow.DROP_NEWEST, [2, 3]),
+        (BufferOverflow.BLOCK, [2, 3, 4, 5]),
+    ],
+)
+async def test_buffer_overflow(block_run, overflow: BufferOverflow, values: list[int]):
+    run = block_run(Buffer, max_size=2, overflow=overflow)
+    for value in [1, 2, 3, 4, 5]:
+        await run.step("value", value)
+
+    assert run.state["values"] == values
+    assert len(run.state["arrived_at"]) == len(values)
+    if overflow == BufferOverflow.BLOCK:
+        assert ("is_full", True) in run.outputs
+
+        await run.step("next", None)
+        await run.step("next", None)
+        await run.step("next", None)
+        assert run.outputs[-2:] == [("output", 4), ("is_full", False)]
+
+
+@pytest.mark.asyncio
+async def test_buffer_flushes_after_flush_ms(block_run, monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+
+    run = block_run(Buffer, flush_ms=100)
+    await run.step("value", 1)
+    await run.step("value", 2)
+    now[0] = 0.05
+    await run.step("value", 3)
+    now[0] = 0.15
+    await run.step("value", 4)
+
+    assert run.outputs == [("output", 1), ("output", 2), ("output", 3), ("output", 4)]
+    assert run.state["values"] == []
+
+
+@pytest.mark.asyncio
+async def test_buffer_flush_times_the_value_now_at_the_front(block_run, monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+
+    run = block_run(Buffer, flush_ms=100)
+    await run.step("value", 1)
+    await run.step("value", 2)
+    now[0] = 0.09
+    await run.step("value", 3)
+    now[0] = 0.095
+    await run.step("next", None)
+
+    # 2 has been released, 3 has only waited 10ms
+    now[0] = 0.1
+    await run.step("value", 4)
+    assert run.outputs == [("output", 1), ("output", 2)]
+    assert run.state["values"] == [3, 4]
+
+    now[0] = 0.19
+    await run.step("value", 5)
+    assert run.outputs[2:] == [("output", 3), ("output", 4), ("output", 5)]
@@ -1,11 +1,35 @@
+import asyncio
+
 import pytest
+import pytest_asyncio
 
 from smartspace.blocks.http import (
     HTTPError,
     HTTPMethod,
     HTTPRequest,
+    HTTPStreamRequest,
+    LatencyHistogram,
     RequestObject,
+    SSEEvent,
+    http_client_pool,
 )
+from smartspace.enums import ChannelEvent
+from smartspace.tests.local_server import LocalResponse
+
+
+@pytest_asyncio.fixture(autouse=True)
+async def close_http_clients():
+    """Closes the pooled clients each test opened, even when it fails"""
+    yield
+    await http_client_pool.aclose()
+
+
+@pytest.fixture
+def response_cache():
+    """The response cache used by cached_block(), emptied before the test"""
+    cache = cached_block()._get_response_cache()
+    cache.clear()
+    return cache
 
 
 @pytest.mark.asyncio
@@ -90,3 +114,469 @@ async def test_make_request_get_with_query_params():
     assert (
         response.body[0]["postId"] == 1
     )  # Ensure the query parameter is reflected in the response
+
+
+@pytest.mark.asyncio
+async def test_make_request_reuses_pooled_connection(local_server):
+    @local_server.route("/items")
+    async def items(request):
+        return LocalResponse.json({"path": request.path})
+
+    for _ in range(5):
+        response = await HTTPRequest().make_request(
+            RequestObject(method=HTTPMethod.GET, url=f"{local_server.url}/items")
+        )
+        assert response.body == {"path": "/items"}
+
+    assert local_server.connections == 1
+
+    metrics = next(
+        m for m in http_client_pool.metrics() if m.origin == local_server.url
+    )
+    assert metrics.requests == 5
+    assert metrics.new_connections == 1
+    assert metrics.reuse_rate == 0.8
+    assert metrics.open_connections == 1
+
+
+@pytest.mark.asyncio
+async def test_make_request_separate_pool_per_client_settings(local_server):
+    @local_server.route("/items")
+    async def items(request):
+        return LocalResponse.json({})
+
+    first = HTTPRequest()
+    second = HTTPRequest()
+    second.timeout = 5
+
+    await first.make_request(RequestObject(url=f"{local_server.url}/items"))
+    await second.make_request(RequestObject(url=f"{local_server.url}/items"))
+
+    assert local_server.connections == 2
+
+
+@pytest.mark.asyncio
+async def test_make_requests_in_order_with_errors(local_server):
+    in_flight = 0
+    max_in_flight = 0
+
+    @local_server.route("/items")
+    async def items(request):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return LocalResponse.json({"query": request.query})
+
+    block = HTTPRequest()
+    block.concurrency = 3
+    requests = [
+        RequestObject(url=f"{local_server.url}/items", query_params={"i": i})
+        for i in range(10)
+    ]
+    requests[4] = RequestObject(url=f"{local_server.url}/missing")
+
+    results = await block.make_requests(requests)
+
+    assert [r.index for r in results] == list(range(10))
+    assert results[0].response.body == {"query": "i=0"}
+    assert results[9].response.body == {"query": "i=9"}
+    assert results[4].status_code == 404
+    assert results[4].error
+    assert max_in_flight <= 3
+
+
+@pytest.mark.asyncio
+async def test_requests_without_concurrency_run_one_at_a_time(local_server):
+    @local_server.route("/items")
+    async def items(request):
+        return LocalResponse.json({"query": request.query})
+
+    block = HTTPRequest()
+    block.concurrency = 0
+    requests = [
+        RequestObject(url=f"{local_server.url}/items", query_params={"i": i})
+        for i in range(3)
+    ]
+
+    results = await asyncio.wait_for(block.make_requests(requests), timeout=5)
+    assert [r.response.body for r in results] == [{"query": f"i={i}"} for i in range(3)]
+
+    stream = HTTPRequest()
+    stream.concurrency = 0
+    await asyncio.wait_for(stream.stream_requests(requests), timeout=5)
+    channel_messages = [
+        output.value for m in stream.get_messages() for output in m.outputs
+    ]
+    assert len(channel_messages) == 4
+    assert channel_messages[-1].event == ChannelEvent.CLOSE
+
+    await http_client_pool.aclose()
+
+
+@pytest.mark.asyncio
+async def test_make_requests_rate_limited_per_host(local_server):
+    @local_server.route("/items")
+    async def items(request):
+        return LocalResponse.json({})
+
+    block = HTTPRequest()
+    block.requests_per_second = 50
+    loop = asyncio.get_running_loop()
+
+    start = loop.time()
+    await block.make_requests(
+        [RequestObject(url=f"{local_server.url}/items") for _ in range(6)]
+    )
+
+    assert loop.time() - start >= 0.1
+
+
+@pytest.mark.asyncio
+async def test_stream_requests_sends_results_as_they_complete(local_server):
+    @local_server.route("/slow")
+    async def slow(request):
+        await asyncio.sleep(0.05)
+        return LocalResponse.json("slow")
+
+    @local_server.route("/fast")
+    async def fast(request):
+        return LocalResponse.json("fast")
+
+    block = HTTPRequest()
+    await block.stream_requests(
+        [
+            RequestObject(url=f"{local_server.url}/slow"),
+            RequestObject(url=f"{local_server.url}/fast"),
+        ]
+    )
+    channel_messages = [
+        output.value for m in block.get_messages() for output in m.outputs
+    ]
+
+    assert [m.data.index for m in channel_messages[:-1]] == [1, 0]
+    assert channel_messages[-1].event == ChannelEvent.CLOSE
+
+
+def cached_block(**config) -> HTTPRequest:
+    block = HTTPRequest()
+    block.cache = True
+    for name, value in config.items():
+        setattr(block, name, value)
+    return block
+
+
+@pytest.mark.asyncio
+async def test_cache_serves_fresh_response(local_server, response_cache):
+    @local_server.route("/reference")
+    async def reference(request):
+        return LocalResponse.json(
+            {"count": len(local_server.requests)}, **{"Cache-Control": "max-age=60"}
+        )
+
+    request = RequestObject(url=f"{local_server.url}/reference")
+    first = await cached_block().make_request(request)
+    second = await cached_block().make_request(request)
+
+    assert first.body == second.body == {"count": 1}
+    assert len(local_server.requests) == 1
+
+
+@pytest.mark.asyncio
+async def test_cache_revalidates_with_etag(local_server, response_cache):
+    @local_server.route("/reference")
+    async def reference(request):
+        if request.headers.get("if-none-match") == '"v1"':
+            return LocalResponse(status=304, headers={"ETag": '"v1"'})
+        return LocalResponse.json({"version": 1}, ETag='"v1"')
+
+    request = RequestObject(url=f"{local_server.url}/reference")
+    first = await cached_block().make_request(request)
+    second = await cached_block().make_request(request)
+
+    assert first.body == second.body == {"version": 1}
+    assert len(local_server.requests) == 2
+    assert local_server.requests[1].headers["if-none-match"] == '"v1"'
+
+
+@pytest.mark.asyncio
+async def test_cached_responses_are_copies(local_server, response_cache):
+    @local_server.route("/fresh")
+    async def fresh(request):
+        return LocalResponse.json({"items": [1]}, **{"Cache-Control": "max-age=60"})
+
+    @local_server.route("/revalidated")
+    async def revalidated(request):
+        if request.headers.get("if-none-match") == '"v1"':
+            return LocalResponse(status=304, headers={"ETag": '"v1"'})
+        return LocalResponse.json({"items": [1]}, ETag='"v1"')
+
+    for path in ["fresh", "revalidated"]:
+        request = RequestObject(url=f"{local_server.url}/{path}")
+        (await cached_block().make_request(request)).body["items"].append(2)
+        (await cached_block().make_request(request)).body["items"].append(3)
+
+        assert (await cached_block().make_request(request)).body == {"items": [1]}
+
+    assert len(local_server.requests) == 4
+
+
+@pytest.mark.asyncio
+async def test_cache_no_store_and_ttl_override(local_server, response_cache):
+    @local_server.route("/private")
+    async def private(request):
+        return LocalResponse.json({}, **{"Cache-Control": "no-store"})
+
+    @local_server.route("/plain")
+    async def plain(request):
+        return LocalResponse.json({})
+
+    for _ in range(2):
+        await cached_block().make_request(
+            RequestObject(url=f"{local_server.url}/private")
+        )
+    assert len(local_server.requests) == 2
+
+    for _ in range(2):
+        await cached_block(cache_ttl=60).make_request(
+            RequestObject(url=f"{local_server.url}/plain")
+        )
+    assert len(local_server.requests) == 3
+
+
+@pytest.mark.asyncio
+async def test_cache_on_disk(local_server, tmp_path):
+    @local_server.route("/reference")
+    async def reference(request):
+        return LocalResponse.json([1, 2], **{"Cache-Control": "max-age=60"})
+
+    request = RequestObject(url=f"{local_server.url}/reference")
+
+    await cached_block(cache_dir=str(tmp_path)).make_request(request)
+    # Drop the in memory entries so the response has to come from disk
+    cached_block(cache_dir=str(tmp_path))._get_response_cache()._entries.clear()
+    response = await cached_block(cache_dir=str(tmp_path)).make_request(request)
+
+    assert response.body == [1, 2]
+    assert response.content == b"[1, 2]"
+    assert len(local_server.requests) == 1
+
+
+@pytest.mark.asyncio
+async def test_cache_on_disk_keeps_most_recent_entries(local_server, tmp_path):
+    @local_server.route("/reference")
+    async def reference(request):
+        return LocalResponse.json(request.query, **{"Cache-Control": "max-age=60"})
+
+    config = {"cache_dir": str(tmp_path), "cache_max_disk_entries": 2}
+    for i in range(3):
+        await cached_block(**config).make_request(
+            RequestObject(url=f"{local_server.url}/reference", query_params={"i": i})
+        )
+        # Files are ordered by modification time, make sure each one is later
+        await asyncio.sleep(0.01)
+
+    assert len(list(tmp_path.glob("*.json"))) == 2
+
+    cached_block(**config)._get_response_cache()._entries.clear()
+    for i in reversed(range(3)):
+        await cached_block(**config).make_request(
+            RequestObject(url=f"{local_server.url}/reference", query_params={"i": i})
+        )
+
+    # The first response was evicted from disk, so it was requested again
+    assert [r.query for r in local_server.requests] == ["i=0", "i=1", "i=2", "i=0"]
+
+
+async def _stream(*chunks: bytes):
+    for chunk in chunks:
+        await asyncio.sleep(0)
+        yield chunk
+
+
+async def _run_stream(server_url: str, format: str, **config) -> list:
+    block = HTTPStreamRequest()
+    block.format = format
+    for name, value in config.items():
+        setattr(block, name, value)
+
+    await block.make_request(RequestObject(url=f"{server_url}/stream"))
+    channel_messages = [
+        output.value for m in block.get_messages() for output in m.outputs
+    ]
+
+    assert channel_messages[-1].event == ChannelEvent.CLOSE
+    return [m.data for m in channel_messages[:-1]]
+
+
+@pytest.mark.asyncio
+async def test_stream_request_lines_and_ndjson(local_server):
+    @local_server.route("/stream")
+    async def stream(request):
+        return LocalResponse(chunks=_stream(b'{"a": 1}\n{"a"', b': 2}\n\n{"a": 3}\n'))
+
+    assert await _run_stream(local_server.url, "lines") == [
+        '{"a": 1}',
+        '{"a": 2}',
+        "",
+        '{"a": 3}',
+    ]
+    assert await _run_stream(local_server.url, "ndjson") == [
+        {"a": 1},
+        {"a": 2},
+        {"a": 3},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_stream_request_bytes(local_server):
+    @local_server.route("/stream")
+    async def stream(request):
+        return LocalResponse(chunks=_stream(b"abc", b"defgh"))
+
+    chunks = await _run_stream(local_server.url, "bytes", chunk_size=4)
+
+    assert chunks == [b"abcd", b"efgh"]
+
+
+@pytest.mark.asyncio
+async def test_stream_request_sse(local_server):
+    @local_server.route("/stream")
+    async def stream(request):
+        return LocalResponse(
+            headers={"Content-Type": "text/event-stream"},
+            chunks=_stream(
+                b": comment\n",
+                b"data: first\n\n",
+                b"event: update\nid: 7\ndata: line one\ndata: line two\n\n",
+            ),
+        )
+
+    events = await _run_stream(local_server.url, "sse")
+
+    assert events == [
+        SSEEvent(data="first"),
+        SSEEvent(event="update", id="7", data="line one\nline two"),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_stream_request_error_status(local_server):
+    block = HTTPStreamRequest()
+
+    with pytest.raises(HTTPError) as e:
+        await block.make_request(RequestObject(url=f"{local_server.url}/missing"))
+
+    assert e.value.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_hedged_request_uses_first_response(local_server):
+    @local_server.route("/flaky")
+    async def flaky(request):
+        if len(local_server.requests) == 1:
+            await asyncio.sleep(1)
+        return LocalResponse.json({"attempt": len(local_server.requests)})
+
+    block = HTTPRequest()
+    block.hedge = True
+    block.hedge_delay = 0.05
+    loop = asyncio.get_running_loop()
+
+    start = loop.time()
+    response = await block.make_request(RequestObject(url=f"{local_server.url}/flaky"))
+
+    assert response.body == {"attempt": 2}
+    assert loop.time() - start < 0.5
+
+
+@pytest.mark.asyncio
+async def test_hedged_request_cancelled_before_hedging(local_server):
+    @local_server.route("/slow")
+    async def slow(request):
+        await asyncio.sleep(1)
+        return LocalResponse.json({})
+
+    block = HTTPRequest()
+    block.hedge = True
+    block.hedge_delay = 0.5
+    block.latency_budget = 0.05
+
+    with pytest.raises(HTTPError):
+        await block.make_request(RequestObject(url=f"{local_server.url}/slow"))
+    await asyncio.sleep(0.01)
+
+    assert not [
+        task
+        for task in asyncio.all_tasks()
+        if task.get_coro().__qualname__.endswith("_attempt.<locals>.send")
+    ]
+
+
+def test_latency_histogram_percentile():
+    latencies = LatencyHistogram()
+    for i in range(10):
+        latencies.record(i)
+    assert latencies.percentile(95) is None
+
+    for i in range(10, 100):
+        latencies.record(i)
+    assert latencies.percentile(95) == 95
+    assert latencies.percentile(100) == 99
+
+
+@pytest.mark.asyncio
+async def test_retries_idempotent_request(local_server):
+    @local_server.route("/unavailable")
+    async def unavailable(request):
+        if len(local_server.requests) < 3:
+            return LocalResponse(status=503)
+        return LocalResponse.json("ok")
+
+    block = HTTPRequest()
+    block.max_retries = 3
+    block.retry_backoff = 0.001
+    response = await block.make_request(
+        RequestObject(url=f"{local_server.url}/unavailable")
+    )
+
+    assert response.body == "ok"
+    assert len(local_server.requests) == 3
+
+
+@pytest.mark.asyncio
+async def test_retries_stop_at_latency_budget(local_server):
+    @local_server.route("/unavailable")
+    async def unavailable(request):
+        return LocalResponse(status=503)
+
+    block = HTTPRequest()
+    block.max_retries = 100
+    block.retry_backoff = 0.05
+    block.latency_budget = 0.3
+
+    with pytest.raises(HTTPError) as e:
+        await block.make_request(RequestObject(url=f"{local_server.url}/unavailable"))
+
+    assert e.value.status_code == 503
+    assert 1 < len(local_server.requests) < 100
+
+
+@pytest.mark.asyncio
+async def test_post_is_not_retried(local_server):
+    @local_server.route("/unavailable")
+    async def unavailable(request):
+        return LocalResponse(status=503)
+
+    block = HTTPRequest()
+    block.max_retries = 3
+
+    with pytest.raises(HTTPError):
+        await block.make_request(
+            RequestObject(
+                method=HTTPMethod.POST, url=f"{local_server.url}/unavailable", body={}
+            )
+        )
+
+    assert len(local_server.requests) == 1
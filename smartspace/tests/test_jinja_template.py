@@ -0,0 +1,66 @@
+import pytest
+from jinja2.exceptions import SecurityError
+
+from smartspace.blocks.jinja_template import (
+    StringTemplate,
+    StringTemplateBatch,
+    StringTemplateStream,
+    get_template,
+)
+from smartspace.enums import ChannelEvent
+
+
+@pytest.mark.asyncio
+async def test_render_template():
+    block = StringTemplate()
+    block.template = "Hello {{ name }}!"
+
+    result = await block.build(name="world")
+
+    assert result == "Hello world!"
+
+
+def test_template_is_compiled_once():
+    source = "{{ a }} + {{ b }}"
+
+    assert get_template(source) is get_template(source)
+    assert get_template(source) is not get_template(source, sandboxed=True)
+
+
+@pytest.mark.asyncio
+async def test_sandboxed_template_blocks_unsafe_access():
+    block = StringTemplate()
+    block.template = "{{ value.__class__.__mro__ }}"
+    block.sandboxed = True
+
+    with pytest.raises(SecurityError):
+        await block.build(value="text")
+
+
+@pytest.mark.asyncio
+async def test_render_batch():
+    block = StringTemplateBatch()
+    block.template = "{{ greeting }} {{ name }}"
+
+    result = await block.build(
+        [
+            {"greeting": "Hello", "name": "Alice"},
+            {"greeting": "Goodbye", "name": "Bob"},
+        ]
+    )
+
+    assert result == ["Hello Alice", "Goodbye Bob"]
+
+
+@pytest.mark.asyncio
+async def test_render_stream():
+    block = StringTemplateStream()
+    block.template = "Item {{ i }}"
+
+    await block.build([{"i": i} for i in range(3)])
+    channel_messages = [
+        output.value for m in block.get_messages() for output in m.outputs
+    ]
+
+    assert [m.data for m in channel_messages[:-1]] == ["Item 0", "Item 1", "Item 2"]
+    assert channel_messages[-1].event == ChannelEvent.CLOSE
@@ -0,0 +1,480 @@
+import asyncio
+import json
+from datetime import datetime
+from random import Random
+from typing import Any
+
+import pytest
+from pydantic import BaseModel
+
+from smartspace.blocks.columnar import is_columnar
+from smartspace.blocks.json_blocks import (
+    PARSE_YIELD_INTERVAL,
+    ChannelJoin,
+    Get,
+    GetJsonField,
+    GetMany,
+    Join,
+    JoinStream,
+    JoinType,
+    JsonFormat,
+    JsonParser,
+    ParseJsonStream,
+    iter_json_items,
+)
+from smartspace.blocks.joins import JoinStrategy
+from smartspace.blocks.json_path import compile_path, compile_paths
+from smartspace.enums import ChannelEvent
+from smartspace.tests.block_run import channel_close, channel_data
+
+
+@pytest.mark.asyncio
+async def test_get_single_value():
+    block = Get()
+    block.path = "$.a.b"
+
+    result = await block.get({"a": {"b": 1}})
+
+    assert result == 1
+
+
+@pytest.mark.asyncio
+async def test_get_from_list():
+    block = Get()
+    block.path = "$[*].a"
+
+    result = await block.get([{"a": 1}, {"a": 2}])
+
+    assert result == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_get_resolves_spans_with_text():
+    block = Get()
+    block.path = "$[1]"
+    text = ["Hello world. Goodbye world."]
+    spans = [
+        {"document": 0, "start": 0, "end": 12, "token_count": 3},
+        {"document": 0, "start": 13, "end": 27, "token_count": 3},
+    ]
+
+    result = await block.get(spans, text)
+
+    assert result == ["Goodbye world."]
+
+
+@pytest.mark.asyncio
+async def test_get_column_from_columnar_table():
+    block = Get()
+    block.path = "$[*].name"
+
+    result = await block.get(
+        {"columns": ["id", "name"], "data": {"id": [1, 2], "name": ["a", "b"]}}
+    )
+
+    assert result == ["a", "b"]
+
+
+@pytest.mark.asyncio
+async def test_get_filter_on_columnar_table():
+    block = Get()
+    block.path = "$[?(@.id > 1)].name"
+
+    result = await block.get(
+        {"columns": ["id", "name"], "data": {"id": [1, 2], "name": ["a", "b"]}}
+    )
+
+    assert result == ["b"]
+
+
+@pytest.mark.asyncio
+async def test_get_ignores_lookalike_of_columnar_table():
+    block = Get()
+    block.path = "$.data.total"
+
+    result = await block.get({"columns": ["a"], "data": {"total": 5}})
+
+    assert result == 5
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        {"columns": ["a"], "data": {"total": 5}},
+        {"columns": ["a"], "data": {"a": 5}},
+        {"columns": ["a", "b"], "data": {"a": [1], "b": [1, 2]}},
+        {"columns": ["a", "a"], "data": {"a": [1]}},
+        {"columns": [1], "data": {1: [1]}},
+    ],
+)
+def test_is_columnar_rejects_malformed_tables(value: Any):
+    assert not is_columnar(value)
+
+
+@pytest.mark.asyncio
+async def test_join_columnar_tables():
+    block = Join()
+    block.key = "id"
+    block.joinType = JoinType.OUTER
+
+    result = await block.Join(
+        {"columns": ["id", "name"], "data": {"id": [1, 2], "name": ["a", "b"]}},
+        {"columns": ["id", "price"], "data": {"id": [2, 3], "price": [5, 6]}},
+    )
+
+    columns = ["id", "name", "price"]
+    assert sorted(result["columns"]) == columns
+    rows = sorted(zip(*(result["data"][c] for c in columns)))
+    assert rows == [(1, "a", None), (2, "b", 5), (3, None, 6)]
+
+
+@pytest.mark.asyncio
+async def test_join_columnar_table_with_records():
+    block = Join()
+    block.key = "id"
+
+    result = await block.Join(
+        {"columns": ["id", "name"], "data": {"id": [1, 2], "name": ["a", "b"]}},
+        [{"id": 2, "price": 5}],
+    )
+
+    assert result == [{"id": 2, "name": "b", "price": 5}]
+
+
+@pytest.mark.asyncio
+async def test_join_columnar_missing_key():
+    block = Join()
+    block.key = "id"
+
+    with pytest.raises(KeyError):
+        await block.Join({"columns": ["name"], "data": {"name": ["a"]}}, [])
+
+
+def _join(key, join_type=JoinType.INNER, strategy=JoinStrategy.HASH) -> Join:
+    block = Join()
+    block.key = key
+    block.joinType = join_type
+    block.strategy = strategy
+    return block
+
+
+@pytest.mark.asyncio
+async def test_join_many_to_many():
+    left = [{"id": 1, "l": "a"}, {"id": 1, "l": "b"}, {"id": 2, "l": "c"}]
+    right = [{"id": 1, "r": "x"}, {"id": 1, "r": "y"}, {"id": 3, "r": "z"}]
+
+    result = await _join("id").Join(left, right)
+
+    assert sorted((row["l"], row["r"]) for row in result) == [
+        ("a", "x"),
+        ("a", "y"),
+        ("b", "x"),
+        ("b", "y"),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_join_composite_key_and_missing_keys():
+    left = [{"a": 1, "b": 1, "l": 1}, {"a": 1, "b": 2, "l": 2}, {"a": 1, "l": 3}]
+    right = [{"a": 1, "b": 2, "r": 1}, {"b": 1, "r": 2}]
+
+    result = await _join(["a", "b"], JoinType.LEFT_OUTER).Join(left, right)
+
+    assert result == [
+        {"a": 1, "b": 1, "l": 1},
+        {"a": 1, "b": 2, "l": 2, "r": 1},
+        {"a": 1, "l": 3},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_join_semi_joins_keep_each_row_once():
+    left = [{"id": 1, "l": "a"}, {"id": 2, "l": "b"}]
+    right = [{"id": 1, "r": "x"}, {"id": 1, "r": "y"}]
+
+    assert await _join("id", JoinType.LEFT_INNER).Join(left, right) == left[:1]
+    assert await _join("id", JoinType.RIGHT_INNER).Join(left, right) == right
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("join_type", list(JoinType))
+async def test_join_sort_merge_matches_hash(join_type: JoinType):
+    random = Random(join_type.value)
+    left = sorted(
+        ({"id": random.randint(0, 8), "l": i} for i in range(30)),
+        key=lambda row: row["id"],
+    )
+    right = sorted(
+        ({"id": random.randint(0, 8), "r": i} for i in range(20)),
+        key=lambda row: row["id"],
+    )
+    right.insert(5, {"r": -1})
+
+    hashed = await _join("id", join_type).Join(left, right)
+    merged = await _join("id", join_type, JoinStrategy.SORT_MERGE).Join(left, right)
+
+    assert sorted(map(_row_key, merged)) == sorted(map(_row_key, hashed))
+
+
+def _row_key(row: dict[str, Any]) -> tuple:
+    return tuple(sorted(row.items()))
+
+
+@pytest.mark.asyncio
+async def test_join_sort_merge_requires_sorted_inputs():
+    block = _join("id", strategy=JoinStrategy.SORT_MERGE)
+
+    with pytest.raises(ValueError):
+        await block.Join([{"id": 2}, {"id": 1}], [{"id": 1}])
+
+
+@pytest.mark.asyncio
+async def test_join_stream_sends_batches():
+    block = JoinStream()
+    block.key = "id"
+    block.batch_size = 2
+
+    await block.Join(
+        [{"id": i, "l": i} for i in range(5)],
+        [{"id": i, "r": i} for i in range(5)],
+    )
+
+    batches = _streamed(block)
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert [row for batch in batches for row in batch] == [
+        {"id": i, "l": i, "r": i} for i in range(5)
+    ]
+
+
+async def _run_channel_join(
+    block_run, events: list[tuple[str, dict[str, Any] | None]], **config
+) -> tuple[list[Any], dict[str, Any]]:
+    run = block_run(ChannelJoin, **config)
+    for side, row in events:
+        await run.step(side, channel_close() if row is None else channel_data(row))
+
+    return run.sent("result"), run.state
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("join_type", list(JoinType))
+async def test_channel_join_matches_join(block_run, join_type: JoinType):
+    random = Random(join_type.value)
+    left = [{"id": random.randint(0, 6), "l": i} for i in range(20)]
+    right = [{"id": random.randint(0, 6), "r": i} for i in range(15)]
+    left.append({"l": -1})
+
+    events: list[tuple[str, dict[str, Any] | None]] = [
+        *(("left", row) for row in left),
+        *(("right", row) for row in right),
+    ]
+    random.shuffle(events)
+    # Each channel closes straight after its last record
+    for side in ("left", "right"):
+        last = max(i for i, (s, _) in enumerate(events) if s == side)
+        events.insert(last + 1, (side, None))
+
+    channel_messages, state = await _run_channel_join(
+        block_run, events, key="id", joinType=join_type
+    )
+
+    expected = await _join("id", join_type).Join(left, right)
+    assert channel_messages[-1].event == ChannelEvent.CLOSE
+    assert sorted(_row_key(m.data) for m in channel_messages[:-1]) == sorted(
+        map(_row_key, expected)
+    )
+    assert state["left_rows"] == state["right_rows"] == {}
+
+
+@pytest.mark.asyncio
+async def test_channel_join_unique_keys_only_keeps_unmatched(block_run):
+    events: list[tuple[str, dict[str, Any] | None]] = [
+        ("left", {"id": 1, "l": 1}),
+        ("left", {"id": 2, "l": 2}),
+        ("right", {"id": 1, "r": 1}),
+    ]
+
+    channel_messages, state = await _run_channel_join(
+        block_run, events, key="id", unique_keys=True
+    )
+
+    assert [m.data for m in channel_messages] == [{"id": 1, "l": 1, "r": 1}]
+    assert state["left_rows"] == {"2": [{"id": 2, "l": 2}]}
+    assert state["right_rows"] == {}
+
+
+@pytest.mark.asyncio
+async def test_channel_join_runs_again_after_both_channels_close(block_run):
+    one_round: list[tuple[str, dict[str, Any] | None]] = [
+        ("left", {"id": 1, "l": 1}),
+        ("left", None),
+        ("left", None),
+        ("right", {"id": 1, "r": 1}),
+        ("right", None),
+    ]
+
+    channel_messages, state = await _run_channel_join(
+        block_run, [*one_round, *one_round], key="id", joinType=JoinType.OUTER
+    )
+
+    assert [(m.event, m.data) for m in channel_messages] == [
+        (ChannelEvent.DATA, {"id": 1, "l": 1, "r": 1}),
+        (ChannelEvent.CLOSE, None),
+        (ChannelEvent.DATA, {"id": 1, "l": 1, "r": 1}),
+        (ChannelEvent.CLOSE, None),
+    ]
+    assert not state["left_closed"] and not state["right_closed"]
+
+
+def _get_many(paths: dict[str, str]) -> GetMany:
+    block = GetMany()
+    block._load(dynamic_ports=[f"results.{name}" for name in paths])
+    block.paths = paths
+    return block
+
+
+def _sent(block: GetMany) -> dict[str, Any]:
+    return {
+        o.source.port.split(".")[1]: o.value
+        for m in block.get_messages()
+        for o in m.outputs
+    }
+
+
+@pytest.mark.asyncio
+async def test_get_many_sends_each_path_to_its_output():
+    block = _get_many(
+        {
+            "name": "$.user.name",
+            "city": "$.user.address.city",
+            "first_tag": "$.tags[0]",
+            "missing": "$.user.age",
+            "all_tags": "$.tags[*]",
+        }
+    )
+
+    await block.get(
+        {"user": {"name": "a", "address": {"city": "b"}}, "tags": ["x", "y"]}
+    )
+
+    assert _sent(block) == {
+        "name": "a",
+        "city": "b",
+        "first_tag": "x",
+        "missing": None,
+        "all_tags": "x",
+    }
+
+
+@pytest.mark.asyncio
+async def test_get_many_from_columnar_table():
+    block = _get_many({"names": "$[*].name", "first": "$[0].id"})
+
+    await block.get(
+        {"columns": ["id", "name"], "data": {"id": [1, 2], "name": ["a", "b"]}}
+    )
+
+    assert _sent(block) == {"names": ["a", "b"], "first": [1]}
+
+
+def test_compile_paths_matches_compile_path():
+    document = {"a": {"b": [1, {"c": 2}]}, "d": [{"e": 3}, {"e": 4}]}
+    paths = {
+        "ab": "$.a.b",
+        "abc": "$.a.b[1].c",
+        "ab0": "$.a.b[0]",
+        "ab5": "$.a.b[5]",
+        "de": "$.d[*].e",
+        "root": "$",
+    }
+
+    results = compile_paths(paths)(document)
+
+    assert results == {
+        name: compile_path(path)(document) for name, path in paths.items()
+    }
+
+
+class _Item(BaseModel):
+    name: str
+    created: datetime
+
+
+@pytest.mark.asyncio
+async def test_get_json_field_from_models():
+    created = datetime(2024, 1, 2, 3, 4, 5)
+    items = [_Item(name="a", created=created), _Item(name="b", created=created)]
+
+    block = GetJsonField()
+    block.json_field_structure = "$[*].created"
+    result = await block.get(items)
+
+    assert result == [json.loads(items[0].model_dump_json())["created"]] * 2
+
+    block = GetJsonField()
+    block.json_field_structure = "$.name"
+    assert await block.get(items[1]) == ["b"]
+
+
+def _streamed(block: ParseJsonStream | JoinStream) -> list[Any]:
+    channel_messages = [o.value for m in block.get_messages() for o in m.outputs]
+    assert channel_messages[-1].event == ChannelEvent.CLOSE
+    return [m.data for m in channel_messages[:-1]]
+
+
+@pytest.mark.parametrize("parser", [JsonParser.JSON, JsonParser.ORJSON])
+@pytest.mark.parametrize(
+    "text",
+    ['[1, {"a": [2, 3]}, "x" , null]', " [ ] ", '{"a": 1}', "[[1], []]"],
+)
+def test_iter_json_items_matches_json_loads(text: str, parser: JsonParser):
+    value = json.loads(text)
+    expected = value if isinstance(value, list) else [value]
+
+    assert list(iter_json_items(text, JsonFormat.JSON, parser)) == expected
+
+
+@pytest.mark.parametrize("text", ["[1 2]", "[1,]", "[1] 2", "[1"])
+def test_iter_json_items_rejects_invalid_arrays(text: str):
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_json_items(text, JsonFormat.JSON))
+
+
+@pytest.mark.asyncio
+async def test_parse_json_stream_ndjson():
+    block = ParseJsonStream()
+    block.format = JsonFormat.NDJSON
+
+    await block.parse_json('{"a": 1}\n\n[2]\r\n"x"')
+
+    assert _streamed(block) == [{"a": 1}, [2], "x"]
+
+
+@pytest.mark.asyncio
+async def test_parse_json_stream_list_keeps_order():
+    block = ParseJsonStream()
+    block.concurrency = 2
+
+    await block.parse_json(["[1, 2]", "[3]", "4", "[5, 6]"])
+
+    assert _streamed(block) == [1, 2, 3, 4, 5, 6]
+
+
+@pytest.mark.asyncio
+async def test_parse_json_stream_yields_to_event_loop():
+    block = ParseJsonStream()
+    total = PARSE_YIELD_INTERVAL * 3
+    sent_counts = set()
+
+    async def record_sent_counts():
+        while True:
+            sent_counts.add(len(block.get_messages()))
+            await asyncio.sleep(0)
+
+    task = asyncio.ensure_future(record_sent_counts())
+    await asyncio.sleep(0)
+    await block.parse_json(json.dumps(list(range(total))))
+    task.cancel()
+
+    assert any(0 < count < total for count in sent_counts)
+    assert len(_streamed(block)) == total
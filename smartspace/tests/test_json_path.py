@@ -0,0 +1,68 @@
+import pytest
+from jsonpath_ng.ext import parse
+
+from smartspace.blocks.json_path import _parse_simple, compile_path
+
+DOCUMENTS = [
+    {
+        "a": {"b": [{"c": 1}, {"c": 2}], "n": None, "s": "text", "i": 3},
+        "x-y": 4,
+        "where": 5,
+    },
+    [{"a": 1}, {"a": {"b": 2}}, [7, 8]],
+    "text",
+    None,
+]
+
+PATHS = [
+    "$",
+    "$.a",
+    "$.a.b",
+    "$.a.b[0].c",
+    "$.a.b[1]['c']",
+    "$.a.b[-1].c",
+    "$.a.b[5].c",
+    "$.a.n",
+    "$.a.n.q",
+    "$.a[0]",
+    "$.a.s[0]",
+    "$.a.i[0]",
+    "$.a.i.b",
+    "$['x-y']",
+    '$["a"].b[0]',
+    "$[0]",
+    "$[1].a.b",
+    "$[2][1]",
+    "$[*].a",
+    "$.a.b[?(@.c > 1)].c",
+    "$..c",
+]
+
+
+@pytest.mark.parametrize("path", PATHS)
+def test_compiled_path_matches_jsonpath_ng(path):
+    for document in DOCUMENTS:
+        try:
+            expected = [match.value for match in parse(path).find(document)]
+        except TypeError:
+            # jsonpath-ng fails on some type mismatches, compiled paths match nothing
+            expected = []
+
+        assert compile_path(path)(document) == expected, document
+
+
+def test_only_simple_paths_use_direct_lookup():
+    assert _parse_simple("$.a.b[0]['c']") == (
+        (False, "a"),
+        (False, "b"),
+        (True, 0),
+        (False, "c"),
+    )
+    assert _parse_simple("$[*].a") is None
+    assert _parse_simple("$..a") is None
+    assert _parse_simple("$.where") is None
+    assert _parse_simple("a.b") is None
+
+
+def test_compiled_paths_are_cached():
+    assert compile_path("$.a.b") is compile_path("$.a.b")
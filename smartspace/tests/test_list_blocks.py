@@ -0,0 +1,150 @@
+import time
+from typing import Any
+
+import pytest
+
+from smartspace.blocks.lists import BatchMap, Collect, Flatten, Map
+from smartspace.tests.block_run import channel_close, channel_data
+
+
+@pytest.mark.asyncio
+async def test_flatten_lists():
+    result = await Flatten().flatten([[1, 2], [3], []])
+
+    assert result == [1, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_flatten_columnar_tables():
+    result = await Flatten().flatten(
+        [
+            {"columns": ["id"], "data": {"id": [1, 2]}},
+            {"columns": ["id", "name"], "data": {"id": [3], "name": ["c"]}},
+        ]
+    )
+
+    assert result == {
+        "columns": ["id", "name"],
+        "data": {"id": [1, 2, 3], "name": [None, None, "c"]},
+    }
+
+
+@pytest.mark.asyncio
+async def test_flatten_columnar_table_with_lists():
+    result = await Flatten().flatten(
+        [{"columns": ["id"], "data": {"id": [1, 2]}}, [{"id": 3}]]
+    )
+
+    assert result == [{"id": 1}, {"id": 2}, {"id": 3}]
+
+
+@pytest.mark.asyncio
+async def test_map_limits_items_in_flight(block_run):
+    run = block_run(Map, max_concurrency=2)
+    await run.step("map", [1, 2, 3, 4])
+    assert [item for item, *_ in run.tool_calls] == [1, 2]
+    assert run.state["items_state"] == [1, 2, 3, 4]
+
+    # Answer the second item first, the third item takes its slot
+    await run.answer(1, lambda x: x * 10)
+    assert [item for item, *_ in run.tool_calls] == [1, 3]
+    assert run.channel("result") == []
+
+    while run.tool_calls:
+        await run.answer(0, lambda x: x * 10)
+        assert len(run.tool_calls) <= 2
+
+    assert run.sent("results") == [[10, 20, 30, 40]]
+    assert run.channel("result") == [10, 20, 30, 40]
+    assert run.closed("result")
+    assert run.state["early_results"] == {}
+    assert run.state["items_state"] == []
+
+
+@pytest.mark.asyncio
+async def test_map_unordered_without_collecting(block_run):
+    run = block_run(Map, ordered=False, collect_results=False)
+    await run.step("map", [1, 2, 3])
+
+    while run.tool_calls:
+        await run.answer(len(run.tool_calls) - 1, lambda x: x * 10)
+        assert run.state["results_state"] == []
+
+    assert run.channel("result") == [30, 20, 10]
+    assert run.sent("results") == []
+    assert run.closed("result")
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("block_type", [Map, BatchMap])
+async def test_map_empty_input(block_run, block_type: type[Map] | type[BatchMap]):
+    run = block_run(block_type)
+    await run.step("map", [])
+
+    assert run.sent("results") == [[]]
+    assert run.closed("result")
+
+    run = block_run(block_type, collect_results=False)
+    await run.step("map", [])
+
+    assert run.sent("results") == []
+    assert run.closed("result")
+
+
+@pytest.mark.asyncio
+async def test_batch_map_sends_batches(block_run):
+    run = block_run(BatchMap, batch_size=2, max_concurrency=1)
+    await run.step("map", [1, 2, 3, 4, 5])
+    assert [items for items, *_ in run.tool_calls] == [[1, 2]]
+
+    while run.tool_calls:
+        await run.answer(0, lambda items: [x * 10 for x in items])
+
+    assert run.sent("results") == [[10, 20, 30, 40, 50]]
+    assert run.channel("result") == [10, 20, 30, 40, 50]
+    assert run.closed("result")
+    assert run.state["items_state"] == []
+
+
+@pytest.mark.asyncio
+async def test_batch_map_rejects_wrong_number_of_results(block_run):
+    run = block_run(BatchMap, batch_size=2)
+    await run.step("map", [1, 2, 3])
+
+    with pytest.raises(ValueError, match="1 results for batch 0 of 2 items"):
+        await run.answer(0, lambda items: items[:1])
+
+
+async def _run_collect(block_run, items: list[Any], **config: Any):
+    run = block_run(Collect, **config)
+    for item in items:
+        await run.step("collect", channel_data(item))
+    await run.step("collect", channel_close())
+    return run
+
+
+@pytest.mark.asyncio
+async def test_collect_sends_items_on_close(block_run):
+    run = await _run_collect(block_run, [1, 2, 3])
+
+    assert run.outputs == [("items", [1, 2, 3])]
+    assert Collect.items_state == []
+
+
+@pytest.mark.asyncio
+async def test_collect_window_size_sends_batches(block_run):
+    run = await _run_collect(block_run, [1, 2, 3, 4, 5], window_size=2)
+
+    assert run.channel("batch") == [[1, 2], [3, 4], [5]]
+    assert run.closed("batch")
+
+
+@pytest.mark.asyncio
+async def test_collect_window_ms_sends_batches(block_run, monkeypatch):
+    # A clock that moves on 60ms each time it is read
+    clock = iter(range(0, 10_000, 60))
+    monkeypatch.setattr(time, "time", lambda: next(clock) / 1000)
+
+    run = await _run_collect(block_run, [1, 2, 3, 4, 5], window_ms=100)
+
+    assert run.channel("batch") == [[1, 2], [3, 4], [5]]
@@ -3,7 +3,8 @@ from unittest.mock import patch
 import pytest
 from transformers import AutoTokenizer
 
-from smartspace.blocks.sentence_chunk import SentenceChunk
+from smartspace.blocks.sentence_chunk import SentenceChunk, SentenceChunkStream
+from smartspace.enums import ChannelEvent
 
 
 @pytest.mark.asyncio
@@ -93,7 +94,7 @@ async def test_chunk_error_handling():
 @pytest.mark.asyncio
 async def test_chunk_tokenizer_error_handling():
     mocked_chunk = SentenceChunk()
-    mocked_chunk.model_name = "non_existent_model"
+    mocked_chunk.model_name = "non-existent/model"
     input_text = "This is a sample text. "
 
     with patch.object(
@@ -103,3 +104,58 @@ async def test_chunk_tokenizer_error_handling():
             await mocked_chunk.sentence_chunk(input_text)
 
         assert "Error loading tokenizer for model" in str(exc_info.value)
+
+
+@pytest.mark.asyncio
+async def test_stream_matches_list_output():
+    input_texts = [
+        "This is the first sample text. " * 100,
+        "This is the second sample text for testing. " * 100,
+    ]
+
+    expected = await SentenceChunk().sentence_chunk(input_texts)
+
+    block = SentenceChunkStream()
+    await block.sentence_chunk(input_texts)
+    channel_messages = [
+        output.value for m in block.get_messages() for output in m.outputs
+    ]
+
+    assert [m.data for m in channel_messages[:-1]] == expected
+    assert all(m.event == ChannelEvent.DATA for m in channel_messages[:-1])
+    assert channel_messages[-1].event == ChannelEvent.CLOSE
+
+
+@pytest.mark.asyncio
+async def test_stream_empty_input_matches_list_output():
+    block = SentenceChunkStream()
+    await block.sentence_chunk("")
+    channel_messages = [
+        output.value for m in block.get_messages() for output in m.outputs
+    ]
+
+    assert [m.data for m in channel_messages[:-1]] == [""]
+    assert channel_messages[-1].event == ChannelEvent.CLOSE
+
+
+@pytest.mark.asyncio
+async def test_chunk_output_spans():
+    block = SentenceChunk()
+    block.output_spans = True
+    block.chunk_size = 50
+    input_texts = [
+        "This is the first sample text. " * 100,
+        "This is the second sample text for testing. " * 100,
+    ]
+
+    result = await block.sentence_chunk(input_texts)
+
+    assert len(result) > 1
+    assert {span.document for span in result} == {0, 1}
+    text_block = SentenceChunk()
+    text_block.chunk_size = 50
+    expected = await text_block.sentence_chunk(input_texts)
+    assert [
+        input_texts[span.document][span.start : span.end] for span in result
+    ] == expected
+    assert all(span.token_count and span.token_count <= 50 for span in result)
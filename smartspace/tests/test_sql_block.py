@@ -0,0 +1,330 @@
+import pytest
+import pytest_asyncio
+
+from smartspace.blocks.sql import (
+    SQL,
+    SQLBulk,
+    SQLResultCache,
+    SQLStream,
+    _READ_TABLES,
+    _WRITE_TABLES,
+    _prepare_statement,
+    _table_tags,
+    sql_engine_registry,
+    sql_result_cache,
+)
+from smartspace.enums import ChannelEvent
+
+
+@pytest_asyncio.fixture
+async def connection_string(tmp_path):
+    connection_string = f"sqlite+aiosqlite:///{tmp_path / 'test.db'}"
+    await run_query(
+        connection_string,
+        "CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT, price REAL)",
+    )
+    await run_query(
+        connection_string,
+        "INSERT INTO items (id, name, price) VALUES (1, 'apple', 1.5), (2, 'pear', 2.0), (3, 'plum', 0.5)",
+    )
+    yield connection_string
+    await sql_engine_registry.dispose()
+
+
+async def run_query(connection_string: str, query: str, **params):
+    block = SQL()
+    block.connection_string = connection_string
+    block.query = query
+    return await block.run(**params)
+
+
+@pytest.mark.asyncio
+async def test_select_rows(connection_string):
+    result = await run_query(
+        connection_string,
+        "SELECT name FROM items WHERE price > :price ORDER BY id",
+        price=1.0,
+    )
+
+    assert result == [{"name": "apple"}, {"name": "pear"}]
+
+
+@pytest.mark.asyncio
+async def test_select_with_expanding_param(connection_string):
+    result = await run_query(
+        connection_string,
+        "SELECT id FROM items WHERE name IN :names ORDER BY id",
+        names=["pear", "plum"],
+    )
+
+    assert result == [{"id": 2}, {"id": 3}]
+
+
+@pytest.mark.asyncio
+async def test_update_returns_rowcount(connection_string):
+    result = await run_query(
+        connection_string, "UPDATE items SET price = price * 2 WHERE price < :p", p=2.0
+    )
+
+    assert result == 2
+
+
+@pytest.mark.asyncio
+async def test_missing_params(connection_string):
+    with pytest.raises(ValueError):
+        await run_query(connection_string, "SELECT * FROM items WHERE id = :id")
+
+
+@pytest.mark.asyncio
+async def test_engine_is_shared_between_runs(connection_string):
+    for _ in range(3):
+        await run_query(connection_string, "SELECT * FROM items")
+
+    stats = [s for s in sql_engine_registry.stats() if s.url == connection_string]
+    assert len(stats) == 1
+    assert stats[0].checked_out == 0
+    assert stats[0].checked_in == 1
+
+
+@pytest.mark.asyncio
+async def test_stream_rows_in_batches(connection_string):
+    block = SQLStream()
+    block.connection_string = connection_string
+    block.query = "SELECT id FROM items WHERE id >= :first ORDER BY id"
+    block.batch_size = 2
+
+    await block.run(first=1)
+    channel_messages = [
+        output.value for m in block.get_messages() for output in m.outputs
+    ]
+
+    assert [m.data for m in channel_messages[:-1]] == [
+        [{"id": 1}, {"id": 2}],
+        [{"id": 3}],
+    ]
+    assert channel_messages[-1].event == ChannelEvent.CLOSE
+
+
+@pytest.mark.asyncio
+async def test_bulk_insert(connection_string):
+    block = SQLBulk()
+    block.connection_string = connection_string
+    block.query = "INSERT INTO items (id, name, price) VALUES (:id, :name, :price)"
+    block.batch_size = 3
+
+    result = await block.run(
+        [
+            {"id": i, "name": f"item {i}", "price": None if i == 10 else i / 2}
+            for i in range(10, 17)
+        ]
+    )
+
+    assert result == 7
+    rows = await run_query(
+        connection_string, "SELECT id, price FROM items WHERE id >= 10 ORDER BY id"
+    )
+    assert rows[0] == {"id": 10, "price": None}
+    assert rows[-1] == {"id": 16, "price": 8.0}
+
+
+@pytest.mark.asyncio
+async def test_bulk_missing_params_changes_nothing(connection_string):
+    block = SQLBulk()
+    block.connection_string = connection_string
+    block.query = "UPDATE items SET price = :price WHERE id = :id"
+
+    with pytest.raises(ValueError):
+        await block.run([{"id": 1, "price": 10}, {"id": 2}])
+
+    rows = await run_query(connection_string, "SELECT price FROM items WHERE id = 1")
+    assert rows == [{"price": 1.5}]
+
+
+def test_statements_are_cached_by_parameter_types():
+    query = "SELECT * FROM items WHERE id IN :ids AND price > :price"
+
+    first = _prepare_statement(query, {"ids": [1, 2], "price": 1.0})
+    second = _prepare_statement(query, {"price": 3.5, "ids": [5]})
+    scalar_ids = _prepare_statement(query, {"ids": 1, "price": 1.0})
+
+    assert first is second
+    assert scalar_ids is not first
+    assert first._bindparams["ids"].expanding
+    assert not scalar_ids._bindparams["ids"].expanding
+
+
+@pytest.mark.asyncio
+async def test_select_columnar(connection_string):
+    block = SQL()
+    block.connection_string = connection_string
+    block.query = "SELECT id, name FROM items WHERE price < :price ORDER BY id"
+    block.result_format = "columns"
+
+    result = await block.run(price=2.0)
+
+    assert result == {
+        "columns": ["id", "name"],
+        "data": {"id": [1, 3], "name": ["apple", "plum"]},
+    }
+
+
+@pytest.mark.asyncio
+async def test_select_columnar_no_rows(connection_string):
+    block = SQL()
+    block.connection_string = connection_string
+    block.query = "SELECT id, name FROM items WHERE price > 100"
+    block.result_format = "columns"
+
+    result = await block.run()
+
+    assert result == {"columns": ["id", "name"], "data": {"id": [], "name": []}}
+
+
+@pytest.mark.asyncio
+async def test_stream_columnar_batches(connection_string):
+    block = SQLStream()
+    block.connection_string = connection_string
+    block.query = "SELECT id FROM items ORDER BY id"
+    block.batch_size = 2
+    block.result_format = "columns"
+
+    await block.run()
+    channel_messages = [
+        output.value for m in block.get_messages() for output in m.outputs
+    ]
+
+    assert [m.data for m in channel_messages[:-1]] == [
+        {"columns": ["id"], "data": {"id": [1, 2]}},
+        {"columns": ["id"], "data": {"id": [3]}},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_cached_select_and_invalidation_by_write(connection_string):
+    sql_result_cache.clear()
+    query = "SELECT price FROM items WHERE id = :id"
+
+    async def cached_query(**params):
+        block = SQL()
+        block.connection_string = connection_string
+        block.query = query
+        block.cache = True
+        return await block.run(**params)
+
+    stats = sql_result_cache.stats()
+    assert await cached_query(id=1) == [{"price": 1.5}]
+    assert await cached_query(id=1) == [{"price": 1.5}]
+    assert sql_result_cache.stats().hits == stats.hits + 1
+    assert sql_result_cache.stats().misses == stats.misses + 1
+
+    await run_query(connection_string, "UPDATE items SET price = 9 WHERE id = 1")
+
+    assert await cached_query(id=1) == [{"price": 9.0}]
+
+
+@pytest.mark.asyncio
+async def test_cached_qualified_read_invalidated_by_unqualified_write(
+    connection_string,
+):
+    sql_result_cache.clear()
+
+    async def cached_query():
+        block = SQL()
+        block.connection_string = connection_string
+        block.query = "SELECT price FROM main.items WHERE id = 1"
+        block.cache = True
+        return await block.run()
+
+    assert await cached_query() == [{"price": 1.5}]
+
+    await run_query(connection_string, "UPDATE items SET price = 9 WHERE id = 1")
+
+    assert await cached_query() == [{"price": 9.0}]
+
+
+def test_table_tags():
+    assert _table_tags(_READ_TABLES, "SELECT * FROM [dbo].[users]") == {
+        "dbo.users",
+        "users",
+    }
+    assert _table_tags(_WRITE_TABLES, "DELETE users WHERE id = 1") == {"users"}
+    assert _table_tags(_WRITE_TABLES, "DELETE FROM dbo.users WHERE id = 1") == {
+        "dbo.users",
+        "users",
+    }
+    assert _table_tags(
+        _WRITE_TABLES, "INSERT OR REPLACE INTO items (id) VALUES (1)"
+    ) == {"items"}
+
+
+@pytest.mark.asyncio
+async def test_cache_never_skips_writes_that_return_rows(connection_string):
+    sql_result_cache.clear()
+
+    async def cached_query(query: str, **params):
+        block = SQL()
+        block.connection_string = connection_string
+        block.query = query
+        block.cache = True
+        return await block.run(**params)
+
+    count = "SELECT count(*) AS n FROM items"
+    insert = "INSERT INTO items (name, price) VALUES (:name, 1) RETURNING name"
+    assert await cached_query(count) == [{"n": 3}]
+
+    assert await cached_query(insert, name="fig") == [{"name": "fig"}]
+    assert await cached_query(insert, name="fig") == [{"name": "fig"}]
+
+    assert sql_result_cache.stats().entries == 0
+    assert await cached_query(count) == [{"n": 5}]
+
+
+@pytest.mark.asyncio
+async def test_cached_results_are_copies(connection_string):
+    sql_result_cache.clear()
+
+    async def cached_query():
+        block = SQL()
+        block.connection_string = connection_string
+        block.query = "SELECT name FROM items WHERE id = 1"
+        block.cache = True
+        return await block.run()
+
+    (await cached_query())[0]["name"] = "changed"
+    (await cached_query())[0]["name"] = "changed"
+
+    assert await cached_query() == [{"name": "apple"}]
+
+
+@pytest.mark.asyncio
+async def test_cached_select_with_explicit_tags(connection_string):
+    sql_result_cache.clear()
+
+    block = SQL()
+    block.connection_string = connection_string
+    block.query = "SELECT count(*) AS n FROM items"
+    block.cache = True
+    block.cache_tags = ["inventory"]
+    await block.run()
+
+    assert sql_result_cache.stats().entries == 1
+    sql_result_cache.invalidate("items")
+    assert sql_result_cache.stats().entries == 1
+    sql_result_cache.invalidate("inventory")
+    assert sql_result_cache.stats().entries == 0
+
+
+def test_result_cache_bounds():
+    cache = SQLResultCache(max_entries=2, max_bytes=100)
+
+    cache.set("a", [1], 60, [])
+    cache.set("b", [2], 60, [])
+    cache.set("c", [3], 60, [])
+    assert cache.get("a") is None
+    assert cache.get("c") == [3]
+
+    cache.set("big", ["x" * 200], 60, [])
+    assert cache.get("big") is None
+
+    cache.set("expired", [4], 0, [])
+    assert cache.get("expired") is None
@@ -1,9 +1,20 @@
 from unittest.mock import patch
 
 import pytest
+import tiktoken
 from transformers import AutoTokenizer
 
-from smartspace.blocks.token_chunk import TokenChunk
+from llama_index.core.node_parser import TokenTextSplitter
+
+from smartspace.blocks.spans import locate_chunks
+from smartspace.blocks.token_chunk import (
+    IncrementalTokenChunk,
+    TokenChunk,
+    TokenChunkStream,
+    get_tokenizer,
+)
+from smartspace.enums import ChannelEvent, ChannelState
+from smartspace.models import InputChannel
 
 
 @pytest.mark.asyncio
@@ -85,7 +96,7 @@ async def test_chunk_error_handling():
 @pytest.mark.asyncio
 async def test_chunk_tokenizer_error_handling():
     mocked_chunk = TokenChunk()
-    mocked_chunk.model_name = "non_existent_model"
+    mocked_chunk.model_name = "non-existent/model"
     input_text = "This is a sample text. "
 
     with patch.object(
@@ -95,3 +106,209 @@ async def test_chunk_tokenizer_error_handling():
             await mocked_chunk.token_chunk(input_text)
 
         assert "Error loading tokenizer for model" in str(exc_info.value)
+
+
+def test_tokenizer_for_model_versions_and_other_models():
+    cl100k_base = tiktoken.get_encoding("cl100k_base").encode("Hello world")
+    o200k_base = tiktoken.get_encoding("o200k_base").encode("Hello world")
+
+    assert get_tokenizer("gpt-4-0613")("Hello world") == cl100k_base
+    assert get_tokenizer("gpt-4-turbo-preview")("Hello world") == cl100k_base
+    assert get_tokenizer("gpt-4o-mini")("Hello world") == o200k_base
+    with patch.object(
+        AutoTokenizer, "from_pretrained", side_effect=Exception("Tokenizer error")
+    ):
+        assert get_tokenizer("claude-3-haiku-20240307")("Hello world") == cl100k_base
+
+
+@pytest.mark.asyncio
+async def test_stream_matches_list_output():
+    input_texts = [
+        "This is the first sample text. " * 100,
+        "This is the second sample text for testing. " * 100,
+    ]
+
+    expected = await TokenChunk().token_chunk(input_texts)
+
+    block = TokenChunkStream()
+    await block.token_chunk(input_texts)
+    channel_messages = [
+        output.value for m in block.get_messages() for output in m.outputs
+    ]
+
+    assert [m.data for m in channel_messages[:-1]] == expected
+    assert all(m.event == ChannelEvent.DATA for m in channel_messages[:-1])
+    assert channel_messages[-1].event == ChannelEvent.CLOSE
+
+
+@pytest.mark.asyncio
+async def test_stream_matches_list_output_with_custom_separator():
+    input_text = "first-sample-text-for-testing " * 200
+
+    text_block = TokenChunk()
+    text_block.chunk_size = 50
+    text_block.separator = "-"
+    expected = await text_block.token_chunk(input_text)
+
+    block = TokenChunkStream()
+    block.chunk_size = 50
+    block.separator = "-"
+    await block.token_chunk(input_text)
+    channel_messages = [
+        output.value for m in block.get_messages() for output in m.outputs
+    ]
+
+    assert [m.data for m in channel_messages[:-1]] == expected
+
+
+@pytest.mark.asyncio
+async def test_stream_sends_chunks_while_a_document_is_split():
+    encode = get_tokenizer("gpt-3.5-turbo")
+    tokenized: list[str] = []
+
+    def tokenizer(text: str) -> list:
+        tokenized.append(text)
+        return encode(text)
+
+    input_text = " ".join(f"word{i}" for i in range(2000))
+    block = TokenChunkStream()
+    block.chunk_size = 50
+
+    last_word_split_at_first_chunk = None
+    with patch("smartspace.blocks.token_chunk.get_tokenizer", return_value=tokenizer):
+        call = await block.token_chunk._call_inner(input_text)
+        async for message in call:
+            if last_word_split_at_first_chunk is None:
+                last_word_split_at_first_chunk = " word1999" in tokenized
+
+    assert last_word_split_at_first_chunk is False
+
+
+@pytest.mark.asyncio
+async def test_stream_empty_input_matches_list_output():
+    block = TokenChunkStream()
+    await block.token_chunk("")
+    channel_messages = [
+        output.value for m in block.get_messages() for output in m.outputs
+    ]
+
+    assert [m.data for m in channel_messages[:-1]] == [""]
+    assert channel_messages[-1].event == ChannelEvent.CLOSE
+
+
+@pytest.mark.asyncio
+async def test_chunk_output_spans():
+    block = TokenChunk()
+    block.output_spans = True
+    block.chunk_size = 50
+    input_texts = [
+        "This is the first sample text. " * 100,
+        "This is the second sample text for testing. " * 100,
+    ]
+
+    result = await block.token_chunk(input_texts)
+
+    assert len(result) > 1
+    assert {span.document for span in result} == {0, 1}
+    text_block = TokenChunk()
+    text_block.chunk_size = 50
+    expected = await text_block.token_chunk(input_texts)
+    assert [
+        input_texts[span.document][span.start : span.end] for span in result
+    ] == expected
+    assert all(span.token_count and span.token_count <= 50 for span in result)
+
+
+def test_locate_chunks_in_repetitive_text():
+    text = "ab ab ab ab"
+
+    spans = locate_chunks(0, text, ["ab ab ab", "ab ab"])
+
+    assert [(span.start, span.end) for span in spans] == [(0, 8), (6, 11)]
+
+
+def test_locate_chunks_not_in_text():
+    spans = locate_chunks(0, "Wait!! What?", ["Wait!", "What?"])
+
+    assert spans[0] is not None and spans[0].start == 0
+    assert spans[1] is not None and spans[1].start == 7
+
+    spans = locate_chunks(0, "Wait!! What?", ["Wait! What?"])
+
+    assert spans == [None]
+
+
+async def _run_incremental(
+    pieces: list[str], chunk_size: int, chunk_overlap: int, close: bool = True
+):
+    inputs = [
+        InputChannel(state=ChannelState.OPEN, event=ChannelEvent.DATA, data=piece)
+        for piece in pieces
+    ]
+    if close:
+        inputs.append(
+            InputChannel(state=ChannelState.CLOSED, event=ChannelEvent.CLOSE, data=None)
+        )
+
+    state = {}
+    channel_messages = []
+    for text in inputs:
+        block = IncrementalTokenChunk()
+        block.chunk_size = chunk_size
+        block.chunk_overlap = chunk_overlap
+        for name, value in state.items():
+            setattr(block, name, value)
+
+        await block.token_chunk(text)
+
+        for message in block.get_messages():
+            channel_messages.extend(output.value for output in message.outputs)
+            state.update({s.state: s.value for s in message.states})
+
+    return channel_messages, state
+
+
+@pytest.mark.asyncio
+async def test_incremental_chunk_matches_whole_text():
+    input_text = " ".join(f"word{i} is here, and\nthat" for i in range(300))
+    pieces = [input_text[i : i + 37] for i in range(0, len(input_text), 37)]
+
+    channel_messages, state = await _run_incremental(
+        pieces, chunk_size=50, chunk_overlap=10
+    )
+
+    expected = TokenTextSplitter(
+        chunk_size=50,
+        chunk_overlap=10,
+        tokenizer=get_tokenizer("gpt-3.5-turbo"),
+    ).split_text(input_text)
+    assert [m.data for m in channel_messages[:-1]] == expected
+    assert channel_messages[-1].event == ChannelEvent.CLOSE
+    assert state == {"splits": [], "split_tokens": [], "tail": ""}
+
+
+@pytest.mark.asyncio
+async def test_incremental_chunk_emits_before_close():
+    pieces = ["This is a sample text for testing token chunking. " * 20]
+
+    channel_messages, state = await _run_incremental(
+        pieces, chunk_size=50, chunk_overlap=10, close=False
+    )
+
+    assert len(channel_messages) > 1
+    assert all(m.event == ChannelEvent.DATA for m in channel_messages)
+    assert 0 < sum(state["split_tokens"]) <= 50
+
+
+@pytest.mark.asyncio
+async def test_incremental_chunk_splits_text_without_separators():
+    input_text = "x" * 500 + " abc " + "y" * 30
+
+    channel_messages, _ = await _run_incremental(
+        [input_text[:100], input_text[100:]], chunk_size=50, chunk_overlap=10
+    )
+
+    tokenizer = get_tokenizer("gpt-3.5-turbo")
+    chunks = [m.data for m in channel_messages[:-1]]
+    assert len(chunks) > 1
+    assert all(len(tokenizer(chunk)) <= 50 for chunk in chunks)
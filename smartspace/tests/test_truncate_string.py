@@ -2,7 +2,13 @@ from unittest.mock import patch
 
 import pytest
 
-from smartspace.blocks.truncate_string import StringTruncator
+from smartspace.blocks.spans import ChunkSpan
+from smartspace.blocks.truncate_string import (
+    StringTruncator,
+    decode,
+    encode,
+    encode_batch,
+)
 
 
 @pytest.mark.asyncio
@@ -94,3 +100,149 @@ async def test_truncate_string_exact_token_limit():
         result = await truncator.truncate_string(input_string)
 
     assert result == input_string
+
+
+@pytest.mark.asyncio
+async def test_truncate_string_span_input():
+    truncator = StringTruncator()
+    text = ["First document.", "Second document that is long."]
+    span = ChunkSpan(document=1, start=7, end=29)
+
+    with patch("smartspace.blocks.truncate_string.encode") as mock_encode:
+        mock_encode.return_value = [1] * 5
+        result = await truncator.truncate_string(span, text)
+
+    assert result == "document that is long."
+    mock_encode.assert_called_once_with(model=truncator.model_name, text=result)
+
+
+@pytest.mark.asyncio
+async def test_truncate_string_span_without_text():
+    truncator = StringTruncator()
+
+    with pytest.raises(ValueError):
+        await truncator.truncate_string(ChunkSpan(document=0, start=0, end=5))
+
+
+@pytest.mark.asyncio
+async def test_truncate_string_long_input_matches_full_encoding():
+    truncator = StringTruncator()
+    truncator.max_token = 20
+    input_string = "The quick brown fox jumps over the lazy dog. " * 2000
+
+    result = await truncator.truncate_string(input_string)
+
+    expected = decode(
+        model=truncator.model_name,
+        tokens=encode(model=truncator.model_name, text=input_string)[:20],
+    )
+    assert result == expected
+
+
+@pytest.mark.asyncio
+async def test_truncate_string_grows_prefix_for_long_tokens():
+    truncator = StringTruncator()
+    truncator.max_token = 5
+    input_string = "=" * 1000 + " end"
+
+    with (
+        patch("smartspace.blocks.truncate_string.encode") as mock_encode,
+        patch("smartspace.blocks.truncate_string.decode") as mock_decode,
+    ):
+        mock_encode.side_effect = lambda model, text: [1] * (len(text) // 100)
+        mock_decode.return_value = "truncated"
+        result = await truncator.truncate_string(input_string)
+
+    assert result == "truncated"
+    assert [len(c.kwargs["text"]) for c in mock_encode.call_args_list] == [
+        40,
+        80,
+        160,
+        320,
+        640,
+    ]
+
+
+@pytest.mark.asyncio
+async def test_truncate_string_tail_strategy():
+    truncator = StringTruncator()
+    truncator.max_token = 10
+    truncator.strategy = "tail"
+    input_string = " ".join(f"word{i}" for i in range(1000))
+
+    result = await truncator.truncate_string(input_string)
+
+    tokens = encode(model=truncator.model_name, text=input_string)
+    assert result == decode(model=truncator.model_name, tokens=tokens[-10:])
+    assert result.endswith("word999")
+
+
+@pytest.mark.asyncio
+async def test_truncate_string_middle_strategy():
+    truncator = StringTruncator()
+    truncator.max_token = 10
+    truncator.strategy = "middle"
+    input_string = " ".join(f"word{i}" for i in range(1000))
+
+    result = await truncator.truncate_string(input_string)
+
+    assert result.startswith("word0 word1")
+    assert result.endswith("word999")
+    assert len(result) < 100
+
+
+@pytest.mark.asyncio
+async def test_truncate_string_batch():
+    truncator = StringTruncator()
+    truncator.max_token = 10
+    input_strings = [
+        "short",
+        "The quick brown fox jumps over the lazy dog. " * 100,
+        "",
+        " ".join(f"word{i}" for i in range(50)),
+    ]
+
+    result = await truncator.truncate_string(input_strings)
+
+    expected = [
+        decode(
+            model=truncator.model_name,
+            tokens=encode(model=truncator.model_name, text=s)[:10],
+        )
+        for s in input_strings
+    ]
+    assert result == expected
+    assert result[0] == "short"
+    assert result[2] == ""
+
+
+@pytest.mark.asyncio
+async def test_truncate_string_batch_encodes_in_one_call():
+    truncator = StringTruncator()
+    truncator.max_token = 2
+    input_strings = ["a b c", "d e", "f g h i"]
+
+    with (
+        patch("smartspace.blocks.truncate_string.encode") as mock_encode,
+        patch("smartspace.blocks.truncate_string.encode_batch") as mock_encode_batch,
+        patch("smartspace.blocks.truncate_string.decode") as mock_decode,
+    ):
+        mock_encode_batch.side_effect = lambda model, texts: [
+            [1] * len(text.split()) for text in texts
+        ]
+        mock_decode.side_effect = lambda model, tokens: "x" * len(tokens)
+        result = await truncator.truncate_string(input_strings)
+
+    assert result == ["xx", "d e", "xx"]
+    mock_encode.assert_not_called()
+    mock_encode_batch.assert_called_once_with(
+        model=truncator.model_name, texts=input_strings
+    )
+
+
+def test_encode_batch_matches_encode():
+    texts = ["short", "The quick brown fox jumps over the lazy dog.", ""]
+
+    assert encode_batch(model="gpt-3.5-turbo", texts=texts) == [
+        encode(model="gpt-3.5-turbo", text=text) for text in texts
+    ]
@@ -2,7 +2,8 @@ from unittest.mock import patch
 
 import pytest
 
-from smartspace.blocks.window_chunk import WindowChunk
+from smartspace.blocks.window_chunk import WindowChunk, WindowChunkStream
+from smartspace.enums import ChannelEvent
 
 
 @pytest.mark.asyncio
@@ -78,3 +79,56 @@ async def test_chunk_error_handling():
             await mocked_chunk.window_chunk(input_text)
 
         assert "Error during chunking" in str(exc_info.value)
+
+
+@pytest.mark.asyncio
+async def test_stream_matches_list_output():
+    input_texts = [
+        "This is the first sample text. " * 100,
+        "This is the second sample text for testing. " * 100,
+    ]
+
+    expected = await WindowChunk().window_chunk(input_texts)
+
+    block = WindowChunkStream()
+    await block.window_chunk(input_texts)
+    channel_messages = [
+        output.value for m in block.get_messages() for output in m.outputs
+    ]
+
+    assert [m.data for m in channel_messages[:-1]] == expected
+    assert all(m.event == ChannelEvent.DATA for m in channel_messages[:-1])
+    assert channel_messages[-1].event == ChannelEvent.CLOSE
+
+
+@pytest.mark.asyncio
+async def test_stream_empty_input_matches_list_output():
+    block = WindowChunkStream()
+    await block.window_chunk("")
+    channel_messages = [
+        output.value for m in block.get_messages() for output in m.outputs
+    ]
+
+    assert [m.data for m in channel_messages[:-1]] == [""]
+    assert channel_messages[-1].event == ChannelEvent.CLOSE
+
+
+@pytest.mark.asyncio
+async def test_chunk_output_spans():
+    block = WindowChunk()
+    block.output_spans = True
+    block.window_size = 1
+    input_texts = [
+        "This is the first sample text. " * 100,
+        "This is the second sample text for testing. " * 100,
+    ]
+
+    result = await block.window_chunk(input_texts)
+
+    assert len(result) > 1
+    assert {span.document for span in result} == {0, 1}
+    for span in result:
+        window = input_texts[span.document][span.start : span.end]
+        assert window.strip()
+        assert span.token_count is None
+    assert [span.start for span in result[:3]] == [0, 0, 31]